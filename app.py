@@ -1,9 +1,23 @@
 import streamlit as st
 import pandas as pd
 import calendar
-from datetime import datetime, date
+import math
+import os
+from datetime import date, datetime
 import altair as alt
 
+from cache_escala import CacheDeEscalas, chave_configuracao
+from diagnostico import MEDIDOR_INATIVO, Medidor
+from escala import (
+    CANDIDATOS_PADRAO, COLUNAS_RESTRICOES, TIPOS_RESTRICAO, alocacoes_fixas_vazias, estruturas_de_restricoes, excecoes_vazias,
+    ler_tabela_restricoes, normalizar_restricoes
+)
+from armazenamento import BancoDeEscalas
+from exportacao import FORMATOS_EXPORTACAO, exportar_para_arquivo_temporario
+from tarefas import ExecutorDeEscalas, gerar_com_cache
+from validacao import ler_escala, resumo_violacoes, validar_escala
+from visualizacao import calendario_longo, carga_semanal, grafico_diario, grafico_semanal, modo_automatico
+
 # Configuração da página
 st.set_page_config(
     page_title="Gerador de Escala de Trabalho",
@@ -11,120 +25,114 @@ st.set_page_config(
     layout="wide"
 )
 
-# Função para gerar a escala considerando exceções e alocações fixas
-def gerar_escala(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True):
-    # Dicionário para controlar a carga de trabalho de cada funcionário
-    carga_trabalho = {f: 0 for f in funcionarios}
-    
-    # Identificar os dias úteis do mês
-    dias_uteis = []
-    dias_semana_no_mes = {}  # Mapear dias do mês para dias da semana
-    
-    for dia in range(1, calendar.monthrange(ano, mes)[1] + 1):
-        data = date(ano, mes, dia)
-        dia_semana = data.weekday()
-        dias_semana_no_mes[dia] = dia_semana
-        if dia_semana < 5:  # Segunda (0) a Sexta (4)
-            dias_uteis.append(dia)
-    
-    escala = []
-    
-    # Para cada dia útil, alocar funcionários aos turnos
-    for dia in dias_uteis:
-        data = date(ano, mes, dia)
-        dia_semana = calendar.day_name[data.weekday()]
-        dia_semana_num = data.weekday()  # 0 = Segunda, 1 = Terça, ...
-        
-        # Verificar alocações fixas primeiro
-        turno_matutino = None
-        turno_vespertino = None
-        
-        # Verificar alocações fixas por dia da semana
-        for funcionario, detalhes in alocacoes_fixas.get('dia_semana', {}).items():
-            if dia_semana_num in detalhes.get('dias', []) and funcionario in funcionarios:
-                if 'Matutino' in detalhes.get('turnos', []) and not turno_matutino:
-                    turno_matutino = funcionario
-                if 'Vespertino' in detalhes.get('turnos', []) and not turno_vespertino:
-                    turno_vespertino = funcionario
-        
-        # Verificar alocações fixas por dias específicos do mês
-        for funcionario, detalhes in alocacoes_fixas.get('dias_especificos', {}).items():
-            if dia in detalhes.get('dias', []) and funcionario in funcionarios:
-                if 'Matutino' in detalhes.get('turnos', []) and not turno_matutino:
-                    turno_matutino = funcionario
-                if 'Vespertino' in detalhes.get('turnos', []) and not turno_vespertino:
-                    turno_vespertino = funcionario
-        
-        # Encontrar funcionários disponíveis para cada turno (excluindo os que têm exceções)
-        disponiveis_matutino = []
-        disponiveis_vespertino = []
-        
-        for funcionario in funcionarios:
-            # Verificar exceções por dia específico
-            excepcao_dia = (dia, funcionario) in excecoes.get('dias_especificos', {})
-            
-            # Verificar exceções por intervalo de dias
-            excepcao_intervalo = False
-            for intervalo in excecoes.get('intervalos', {}).get(funcionario, []):
-                if intervalo[0] <= dia <= intervalo[1]:
-                    excepcao_intervalo = True
-                    break
-            
-            # Verificar exceções por dia da semana
-            excepcao_dia_semana = dia_semana_num in excecoes.get('dias_semana', {}).get(funcionario, [])
-            
-            # Verificar exceções por turno específico
-            excepcao_turno_matutino = funcionario in excecoes.get('turnos', {}).get((dia, 'Matutino'), [])
-            excepcao_turno_vespertino = funcionario in excecoes.get('turnos', {}).get((dia, 'Vespertino'), [])
-            
-            # Adicionar às listas de disponíveis se não tiver exceções
-            if not excepcao_dia and not excepcao_intervalo and not excepcao_dia_semana and not excepcao_turno_matutino:
-                if not turno_matutino:  # Se não tiver alocação fixa
-                    disponiveis_matutino.append(funcionario)
-                    
-            if not excepcao_dia and not excepcao_intervalo and not excepcao_dia_semana and not excepcao_turno_vespertino:
-                if not turno_vespertino:  # Se não tiver alocação fixa
-                    disponiveis_vespertino.append(funcionario)
-        
-        # Se considerar carga de trabalho, ordenar funcionários pelo menor número de turnos alocados
-        if considerar_carga:
-            disponiveis_matutino.sort(key=lambda f: carga_trabalho[f])
-            disponiveis_vespertino.sort(key=lambda f: carga_trabalho[f])
-        
-        # Alocar funcionários aos turnos que ainda não foram alocados fixamente
-        if not turno_matutino and disponiveis_matutino:
-            turno_matutino = disponiveis_matutino[0]
-        
-        # Atualizar carga se alocou alguém
-        if turno_matutino:
-            carga_trabalho[turno_matutino] += 1
-            
-            # Tentar não alocar o mesmo funcionário para os dois turnos do mesmo dia
-            if turno_matutino in disponiveis_vespertino and len(disponiveis_vespertino) > 1 and not turno_vespertino:
-                disponiveis_vespertino.remove(turno_matutino)
-        
-        # Alocar para o turno vespertino se ainda não foi alocado fixamente
-        if not turno_vespertino and disponiveis_vespertino:
-            turno_vespertino = disponiveis_vespertino[0]
-            if turno_vespertino:
-                carga_trabalho[turno_vespertino] += 1
-        
-        escala.append({
-            "Data": f"{dia:02d}/{mes:02d}/{ano}",
-            "Dia da Semana": dia_semana,
-            "Turno Matutino": turno_matutino,
-            "Turno Vespertino": turno_vespertino
-        })
-    
-    df = pd.DataFrame(escala)
+# Cache de escalas compartilhado por todas as sessões do servidor
+# MPESCALAS_CACHE_DIR ativa a camada em disco (limite em MB por MPESCALAS_CACHE_MB, padrão 100)
+@st.cache_resource
+def obter_cache():
+    return CacheDeEscalas(
+        diretorio=os.environ.get("MPESCALAS_CACHE_DIR"),
+        limite_disco=int(os.environ.get("MPESCALAS_CACHE_MB", "100")) * 1024 * 1024
+    )
+
+# Banco SQLite com as equipes e as escalas salvas (arquivo definido por MPESCALAS_BANCO, padrão mpescalas.db)
+@st.cache_resource
+def obter_banco():
+    return BancoDeEscalas(os.environ.get("MPESCALAS_BANCO", "mpescalas.db"))
+
+# Executor compartilhado por todas as sessões: as escalas são geradas em segundo plano
+# MPESCALAS_TRABALHADORES define o número de threads (padrão: até 4) e MPESCALAS_PROCESSOS o de processos
+# usados pelo método "candidatos" (padrão: um por núcleo), criados uma única vez
+@st.cache_resource
+def obter_executor():
+    trabalhadores = os.environ.get("MPESCALAS_TRABALHADORES")
+    processos = os.environ.get("MPESCALAS_PROCESSOS")
+    return ExecutorDeEscalas(int(trabalhadores) if trabalhadores else None, int(processos) if processos else None)
+
+# Acompanhar a geração em andamento, atualizando só este trecho da página a cada meio segundo
+# Ao terminar, guarda a escala na sessão e recarrega a página inteira para exibi-la
+@st.fragment(run_every=0.5)
+def acompanhar_geracao():
+    tarefa = st.session_state.get("tarefa")
+    if tarefa is None:
+        return
+    if not tarefa.concluida():
+        st.progress(tarefa.fracao(), text=f"Gerando escala... {tarefa.fracao():.0%}")
+        if st.button("Cancelar geração"):
+            tarefa.cancelar()
+        return
     
-    # Adicionar estatísticas de carga de trabalho
-    estatisticas = pd.DataFrame({
-        "Funcionário": list(carga_trabalho.keys()),
-        "Total de Turnos": list(carga_trabalho.values())
+    del st.session_state["tarefa"]
+    resultado = tarefa.resultado()
+    if resultado is not None:
+        st.session_state["escala"], st.session_state["estados_escala"] = resultado
+        st.session_state["medidor_geracao"] = tarefa.medidor
+        st.session_state["chave_escala"] = tarefa.chave
+    st.rerun()
+
+# Carregar a equipe escolhida em "Equipes salvas": funcionários, opções e restrições (no modo planilha)
+# Chamada como on_click, antes de os widgets serem recriados com os novos valores
+def carregar_equipe_salva():
+    nome = st.session_state["equipe_salva"]
+    banco = obter_banco()
+    equipe = banco.carregar_equipe(nome)
+    st.session_state.update({
+        "nome_equipe": nome,
+        "funcionarios_texto": "\n".join(equipe['funcionarios']),
+        "equilibrar_carga": equipe['considerar_carga'],
+        "metodo": equipe['metodo'],
+        "tempo_limite": float(equipe['tempo_limite']),
+        "candidatos": int(equipe['candidatos']),
+        "semente": int(equipe['semente']),
+        "restricoes": banco.restricoes(nome),
+        "modo_configuracao": "Planilha (em massa)",
+        "versao_editor": st.session_state.get("versao_editor", 0) + 1,
     })
+
+# Abrir como escala atual uma escala salva no banco, escolhida em "Consultar escalas salvas"
+# Chamada como on_click, para que as abas de resultado já mostrem a escala carregada
+def carregar_escala_salva():
+    equipe, ano_salvo, mes_salvo = st.session_state["escala_salva"]
+    st.session_state["escala"] = obter_banco().carregar_escala(equipe, mes_salvo, ano_salvo)
+    # A chave de configuração e o diagnóstico eram os da última geração, não desta escala
+    st.session_state.pop("chave_escala", None)
+    st.session_state.pop("medidor_geracao", None)
+
+# Valores iniciais das opções, guardados na sessão para que carregar_equipe_salva possa substituí-los
+for chave_opcao, valor_inicial in {
+    "equilibrar_carga": True, "metodo": "guloso", "tempo_limite": 10.0, "candidatos": CANDIDATOS_PADRAO, "semente": 0
+}.items():
+    st.session_state.setdefault(chave_opcao, valor_inicial)
+
+# Linhas por página do editor de restrições em massa
+LINHAS_POR_PAGINA = 50
+
+# Aplicar à tabela de restrições as edições feitas numa página do st.data_editor
+# Chamada como on_change; ao final troca a versão do editor para que ele recomece da tabela atualizada
+def aplicar_edicoes_restricoes(chave, inicio):
+    edicoes = st.session_state[chave]
+    tabela = st.session_state["restricoes"]
+    pagina = tabela.iloc[inicio:inicio + LINHAS_POR_PAGINA].copy()
+    
+    for linha, alteracoes in edicoes.get("edited_rows", {}).items():
+        for coluna, valor in alteracoes.items():
+            pagina.iloc[int(linha), pagina.columns.get_loc(coluna)] = valor
+    pagina = pagina.drop(index=pagina.index[edicoes.get("deleted_rows", [])])
+    novas = pd.DataFrame(edicoes.get("added_rows", []), columns=COLUNAS_RESTRICOES)
     
-    return df, estatisticas
+    st.session_state["restricoes"] = pd.concat(
+        [tabela.iloc[:inicio], pagina, novas, tabela.iloc[inicio + LINHAS_POR_PAGINA:]], ignore_index=True
+    ).astype(tabela.dtypes.to_dict(), errors="ignore")
+    st.session_state["versao_editor"] = st.session_state.get("versao_editor", 0) + 1
+
+# Acrescentar à lista de funcionários os nomes que só aparecem na tabela de restrições
+# Chamada como on_click, antes de a caixa de texto ser recriada com a nova lista
+def incluir_funcionarios_da_tabela(faltantes):
+    atuais = [f.strip() for f in st.session_state["funcionarios_texto"].split("\n") if f.strip()]
+    st.session_state["funcionarios_texto"] = "\n".join(atuais + faltantes)
+
+# Instrumentação por fase, ativada pela opção "Diagnóstico de desempenho"
+medidor = Medidor() if st.session_state.get("diagnostico") else MEDIDOR_INATIVO
+medidor.iniciar("widgets")
 
 # Interface do Streamlit
 st.title("🗓️ Gerador de Escala de Trabalho")
@@ -144,11 +152,57 @@ with col1:
     
     # Opções adicionais
     st.subheader("Opções")
-    equilibrar_carga = st.checkbox("Equilibrar carga de trabalho entre funcionários", value=True)
+    equilibrar_carga = st.checkbox("Equilibrar carga de trabalho entre funcionários", key="equilibrar_carga")
+    metodo = st.radio(
+        "Método de alocação",
+        ["guloso", "otimo", "candidatos"],
+        format_func=lambda m: {
+            "guloso": "Rápido (dia a dia)",
+            "otimo": "Ótimo (fluxo de custo mínimo)",
+            "candidatos": "Melhor de vários sorteios"
+        }[m],
+        horizontal=True,
+        key="metodo"
+    )
+    st.checkbox("Diagnóstico de desempenho", key="diagnostico",
+                help="Mostra o tempo de cada fase da geração e permite exportá-lo em JSON.")
+    if st.session_state.get("diagnostico"):
+        st.checkbox("Capturar perfil (cProfile) da geração", key="perfil")
+    tempo_limite = 10.0
+    if metodo == "otimo":
+        tempo_limite = st.number_input(
+            "Tempo máximo de cálculo (segundos)",
+            min_value=1.0,
+            max_value=300.0,
+            help="Se o tempo acabar, a escala é gerada pelo método rápido.",
+            key="tempo_limite"
+        )
+    candidatos, semente = CANDIDATOS_PADRAO, 0
+    if metodo == "candidatos":
+        candidatos = int(st.number_input(
+            "Número de escalas candidatas",
+            min_value=1,
+            max_value=20000,
+            help="Escalas geradas com desempates sorteados; fica a com menos turnos vagos, "
+                 "carga mais equilibrada e menos turnos duplos no mesmo dia.",
+            key="candidatos"
+        ))
+        semente = int(st.number_input("Semente do sorteio", min_value=0, key="semente",
+                                      help="A mesma semente sempre produz a mesma escala."))
+    
+    # Equipes salvas no banco
+    st.subheader("Equipe")
+    equipes_salvas = obter_banco().equipes()
+    if equipes_salvas:
+        st.selectbox("Equipes salvas", equipes_salvas, key="equipe_salva")
+        st.button("Carregar equipe", on_click=carregar_equipe_salva)
+    st.text_input("Nome da equipe", key="nome_equipe",
+                  help="Usado para salvar a equipe, com suas restrições, e as escalas geradas.")
+    nome_equipe = st.session_state["nome_equipe"].strip()
     
     # Inserção da lista de funcionários
     st.subheader("Funcionários")
-    funcionarios_input = st.text_area("Digite os nomes dos funcionários (um por linha)")
+    funcionarios_input = st.text_area("Digite os nomes dos funcionários (um por linha)", key="funcionarios_texto")
     funcionarios = [f.strip() for f in funcionarios_input.split("\n") if f.strip()]
     
     # Mostrar número de funcionários e dias úteis
@@ -161,19 +215,90 @@ with col1:
 
 with col2:
     # Inicialização das estruturas de exceções e alocações fixas
-    excecoes = {
-        'dias_especificos': {},  # Exceções para dias específicos
-        'intervalos': {},        # Exceções para intervalos de dias
-        'dias_semana': {},       # Exceções para dias da semana
-        'turnos': {}             # Exceções para turnos específicos
-    }
+    excecoes = excecoes_vazias()
+    alocacoes_fixas = alocacoes_fixas_vazias()
+    # Com a tabela de restrições inválida, as estruturas ficam vazias: gerar, salvar ou validar ignoraria as restrições
+    restricoes_invalidas = False
     
-    alocacoes_fixas = {
-        'dia_semana': {},       # Alocações fixas por dia da semana
-        'dias_especificos': {}  # Alocações fixas para dias específicos
-    }
+    modo_configuracao = st.radio(
+        "Modo de configuração",
+        ["Por funcionário", "Planilha (em massa)"],
+        horizontal=True,
+        help="Para equipes grandes, importe e edite todas as restrições numa única tabela; "
+             "a lista de funcionários pode ser preenchida a partir dela.",
+        key="modo_configuracao"
+    )
     
-    if funcionarios:
+    if modo_configuracao == "Planilha (em massa)":
+        st.subheader("Restrições em massa")
+        st.caption(
+            "Colunas: funcionario, tipo, dia, dia_fim, turno. "
+            f"Tipos: {', '.join(TIPOS_RESTRICAO)}. "
+            "Para tipos por dia da semana, use 0 (Segunda) a 4 (Sexta)."
+        )
+        
+        if "restricoes" not in st.session_state:
+            st.session_state["restricoes"] = normalizar_restricoes(pd.DataFrame(columns=COLUNAS_RESTRICOES))
+        
+        arquivo = st.file_uploader("Importar restrições (CSV ou XLSX)", type=["csv", "xlsx"])
+        if arquivo is not None and st.session_state.get("arquivo_restricoes") != (arquivo.name, arquivo.size):
+            try:
+                st.session_state["restricoes"] = ler_tabela_restricoes(arquivo, arquivo.name)
+                st.session_state["arquivo_restricoes"] = (arquivo.name, arquivo.size)
+                st.session_state["versao_editor"] = st.session_state.get("versao_editor", 0) + 1
+            except ValueError as erro:
+                st.error(str(erro))
+        
+        tabela = st.session_state["restricoes"]
+        paginas = max(1, math.ceil(len(tabela) / LINHAS_POR_PAGINA))
+        pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1)
+        inicio = (pagina - 1) * LINHAS_POR_PAGINA
+        chave_editor = f"editor_restricoes_{st.session_state.get('versao_editor', 0)}_{pagina}"
+        
+        st.data_editor(
+            tabela.iloc[inicio:inicio + LINHAS_POR_PAGINA],
+            key=chave_editor,
+            on_change=aplicar_edicoes_restricoes,
+            args=(chave_editor, inicio),
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "funcionario": st.column_config.TextColumn("Funcionário", required=True),
+                "tipo": st.column_config.SelectboxColumn("Tipo", options=TIPOS_RESTRICAO, required=True),
+                "dia": st.column_config.NumberColumn("Dia", min_value=0, max_value=31, step=1),
+                "dia_fim": st.column_config.NumberColumn("Fim do intervalo", min_value=1, max_value=31, step=1),
+                "turno": st.column_config.SelectboxColumn("Turno", options=["Matutino", "Vespertino"]),
+            }
+        )
+        st.caption(f"{len(tabela)} restrições")
+        
+        st.download_button(
+            label="📄 Baixar restrições como CSV",
+            data=tabela.to_csv(index=False).encode("utf-8"),
+            file_name="restricoes.csv",
+            mime="text/csv"
+        )
+        
+        try:
+            with medidor.fase("restricoes"):
+                funcionarios_tabela, excecoes, alocacoes_fixas = estruturas_de_restricoes(normalizar_restricoes(tabela))
+        except ValueError as erro:
+            restricoes_invalidas = True
+            funcionarios_tabela = list(dict.fromkeys(tabela["funcionario"].dropna().astype(str).str.strip()))
+            st.error(f"{erro}. Corrija a tabela para gerar, salvar ou validar escalas.")
+        
+        # Na ordem da tabela, como no carregamento de CSV do processamento em lote
+        faltantes = [f for f in funcionarios_tabela if f and f not in funcionarios]
+        if faltantes:
+            st.warning(f"Restrições ignoradas para quem não está na lista de funcionários: {', '.join(faltantes)}")
+            st.button(
+                f"➕ Incluir {len(faltantes)} funcionário(s) da tabela na lista",
+                on_click=incluir_funcionarios_da_tabela,
+                args=(faltantes,)
+            )
+    
+    elif funcionarios:
         # Tabs para separar exceções e alocações fixas
         tab_excecoes, tab_fixas = st.tabs(["Exceções", "Alocações Fixas"])
         
@@ -337,88 +462,232 @@ with col2:
                         except ValueError:
                             st.error(f"Formato inválido para os dias fixos de {funcionario}")
 
+    medidor.encerrar("widgets")
+    medidor.definir("funcionarios", len(funcionarios))
+    medidor.definir("restricoes", sum(len(v) for v in excecoes.values()) + sum(len(v) for v in alocacoes_fixas.values()))
+    
+    # Uma geração em andamento é cancelada se as configurações mudarem
+    tarefa = st.session_state.get("tarefa")
+    if tarefa is not None and not tarefa.concluida() and (
+        not funcionarios
+        or tarefa.chave != chave_configuracao(mes, ano, funcionarios, excecoes, alocacoes_fixas,
+                                              equilibrar_carga, metodo, tempo_limite, candidatos, semente)
+    ):
+        tarefa.cancelar()
+        tarefa = st.session_state.pop("tarefa")
+        st.info("Geração anterior cancelada: as configurações mudaram.")
+    
     # Botão para gerar escala
-    if st.button("Gerar Escala", type="primary"):
+    if st.button("Gerar Escala", type="primary", disabled=restricoes_invalidas):
         if not funcionarios:
             st.warning("Por favor, insira pelo menos um funcionário.")
+        elif tarefa is None or tarefa.concluida() or tarefa.cancelada():
+            # A geração roda em segundo plano; a última escala gerada continua visível enquanto isso
+            # Com a captura de perfil ligada, a geração roda sob cProfile
+            st.session_state["tarefa"] = obter_executor().submeter(
+                chave_configuracao(mes, ano, funcionarios, excecoes, alocacoes_fixas, equilibrar_carga, metodo, tempo_limite,
+                                   candidatos, semente),
+                gerar_com_cache,
+                obter_cache(), st.session_state.get("estados_escala"),
+                mes, ano, funcionarios, excecoes, alocacoes_fixas, equilibrar_carga, metodo, tempo_limite,
+                candidatos=candidatos, semente=semente, executor_processos=obter_executor().processos,
+                medidor=Medidor() if st.session_state.get("diagnostico") else MEDIDOR_INATIVO,
+                perfilar=bool(st.session_state.get("perfil"))
+            )
+    
+    # Guardar no banco os funcionários, as restrições e as opções atuais
+    if st.button("💾 Salvar equipe", disabled=not (nome_equipe and funcionarios) or restricoes_invalidas):
+        obter_banco().salvar_equipe(nome_equipe, funcionarios, excecoes, alocacoes_fixas, equilibrar_carga, metodo,
+                                    tempo_limite, candidatos, semente)
+        st.success(f"Equipe \"{nome_equipe}\" salva.")
+    
+    # O fragmento se reexecuta a cada meio segundo: só é incluído na página enquanto há uma geração na sessão
+    if "tarefa" in st.session_state:
+        acompanhar_geracao()
+    
+    # Resultados da última escala gerada, guardados na sessão para sobreviver às interações com a página
+    escala = st.session_state.get("escala")
+    if escala is not None:
+        medidor.definir("turnos_vagos", int((escala.matutino < 0).sum() + (escala.vespertino < 0).sum()))
+        if escala.prazo_esgotado:
+            st.warning("O método ótimo não terminou dentro do tempo limite: esta escala foi gerada pelo método "
+                       "rápido (guloso). Aumente o tempo limite para tentar de novo.")
+        
+        # Colunas legíveis só para exibição e exportação
+        with medidor.fase("dataframes"):
+            escala_df = escala.tabela()
+            estatisticas_df = escala.estatisticas()
+        
+        # Mostrar resultados em tabs
+        tab1, tab2, tab3 = st.tabs(["Escala", "Estatísticas", "Visualização"])
+        
+        with tab1:
+            st.dataframe(escala_df, use_container_width=True)
+            
+            # Opção de download de CSV
+            csv = escala_df.to_csv(index=False).encode("utf-8")
+            st.download_button(
+                label="📄 Baixar como CSV",
+                data=csv,
+                file_name=f"escala_{escala.mes}_{escala.ano}.csv",
+                mime="text/csv"
+            )
+            
+            # Outros formatos, gerados só quando o botão é clicado
+            for formato, (_, extensao, tipo_mime) in FORMATOS_EXPORTACAO.items():
+                st.download_button(
+                    label=f"📦 Baixar como {formato}",
+                    data=lambda formato=formato, escalas=[(f"{escala.mes:02d}-{escala.ano}", escala)]: (
+                        exportar_para_arquivo_temporario(formato, escalas)
+                    ),
+                    file_name=f"escala_{escala.mes}_{escala.ano}.{extensao}",
+                    mime=tipo_mime,
+                    on_click="ignore"
+                )
+            
+            # Guardar a escala no banco, junto da equipe salva com o nome informado
+            if st.button("💾 Salvar escala no banco", disabled=not nome_equipe):
+                try:
+                    obter_banco().salvar_escala(nome_equipe, escala, st.session_state.get("chave_escala"))
+                    st.success(f"Escala de {escala.mes:02d}/{escala.ano} salva para \"{nome_equipe}\".")
+                except KeyError:
+                    st.error(f"Salve a equipe \"{nome_equipe}\" antes de salvar suas escalas.")
+        
+        with tab2:
+            st.subheader("Distribuição de turnos por funcionário")
+            st.dataframe(estatisticas_df, use_container_width=True)
+            
+            # Gráfico de barras para visualizar distribuição de turnos
+            medidor.iniciar("graficos")
+            chart = alt.Chart(estatisticas_df).mark_bar().encode(
+                x=alt.X('Funcionário', sort='-y'),
+                y=alt.Y('Total de Turnos'),
+                color=alt.Color('Funcionário', legend=None)
+            ).properties(
+                height=300
+            )
+            st.altair_chart(chart, use_container_width=True)
+            medidor.encerrar("graficos")
+        
+        with tab3:
+            st.subheader("Visualização da Escala")
+            
+            visao = st.radio(
+                "Visão",
+                ["automatica", "diaria", "semanal"],
+                format_func=lambda v: {
+                    "automatica": "Automática",
+                    "diaria": "Por dia e turno",
+                    "semanal": "Por funcionário e semana"
+                }[v],
+                horizontal=True
+            )
+            
+            # Preparar dados para visualização do calendário
+            with medidor.fase("calendario"):
+                cal_df = calendario_longo(escala)
+                if visao == "automatica":
+                    visao = modo_automatico(cal_df)
+            
+            with medidor.fase("graficos"):
+                if visao == "semanal":
+                    semanas = carga_semanal(cal_df, escala.mes, escala.ano)
+                    st.altair_chart(grafico_semanal(semanas, escala.mes, escala.ano), use_container_width=True)
+                else:
+                    st.altair_chart(grafico_diario(cal_df, escala.mes, escala.ano), use_container_width=True)
+            
+            # Adicionar legenda de turnos
+            st.info("**Matutino**: Turno da manhã | **Vespertino**: Turno da tarde")
+    
+    # Conferir uma escala recebida (ou a gerada) contra as restrições configuradas acima
+    with st.expander("Validar escala"):
+        recebida = st.file_uploader("Escala editada (CSV ou XLSX, no formato do \"Baixar como CSV\")",
+                                    type=["csv", "xlsx"], key="escala_recebida")
+        try:
+            if restricoes_invalidas:
+                escala_validada = None
+                st.caption("Corrija a tabela de restrições para validar uma escala.")
+            elif recebida is not None:
+                escala_validada = ler_escala(recebida, recebida.name)
+            elif escala is not None:
+                escala_validada = escala_df
+            else:
+                escala_validada = None
+                st.caption("Envie uma escala ou gere uma para validá-la.")
+            
+            if escala_validada is not None:
+                with medidor.fase("validacao"):
+                    violacoes_df = validar_escala(escala_validada, excecoes, alocacoes_fixas, funcionarios)
+                if violacoes_df.empty:
+                    st.success("Nenhuma violação encontrada.")
+                else:
+                    st.warning(f"{len(violacoes_df)} violações encontradas.")
+                    st.dataframe(resumo_violacoes(violacoes_df), hide_index=True, use_container_width=True)
+                    st.dataframe(violacoes_df.drop(columns="Tipo"), hide_index=True, use_container_width=True)
+        except ValueError as erro:
+            st.error(str(erro))
+    
+    # Consultas às escalas salvas no banco, de todas as equipes
+    with st.expander("Consultar escalas salvas"):
+        banco = obter_banco()
+        salvas = banco.escalas_salvas()
+        if salvas.empty:
+            st.caption("Nenhuma escala salva.")
         else:
-            with st.spinner("Gerando escala..."):
-                escala_df, estatisticas_df = gerar_escala(mes, ano, funcionarios, excecoes, alocacoes_fixas, equilibrar_carga)
-                
-                # Mostrar resultados em tabs
-                tab1, tab2, tab3 = st.tabs(["Escala", "Estatísticas", "Visualização"])
-                
-                with tab1:
-                    st.dataframe(escala_df, use_container_width=True)
-                    
-                    # Opção de download de CSV
-                    csv = escala_df.to_csv(index=False).encode("utf-8")
-                    st.download_button(
-                        label="📄 Baixar como CSV",
-                        data=csv,
-                        file_name=f"escala_{mes}_{ano}.csv",
-                        mime="text/csv"
-                    )
-                
-                with tab2:
-                    st.subheader("Distribuição de turnos por funcionário")
-                    st.dataframe(estatisticas_df, use_container_width=True)
-                    
-                    # Gráfico de barras para visualizar distribuição de turnos
-                    chart = alt.Chart(estatisticas_df).mark_bar().encode(
-                        x=alt.X('Funcionário', sort='-y'),
-                        y=alt.Y('Total de Turnos'),
-                        color=alt.Color('Funcionário', legend=None)
-                    ).properties(
-                        height=300
-                    )
-                    st.altair_chart(chart, use_container_width=True)
-                
-                with tab3:
-                    st.subheader("Visualização da Escala")
-                    
-                    # Preparar dados para visualização do calendário
-                    cal_data = []
-                    for i, row in escala_df.iterrows():
-                        data = row['Data']
-                        dia = int(data.split('/')[0])
-                        cal_data.append({
-                            'Dia': dia,
-                            'Turno': 'Matutino',
-                            'Funcionário': row['Turno Matutino'] or '-'
-                        })
-                        cal_data.append({
-                            'Dia': dia,
-                            'Turno': 'Vespertino',
-                            'Funcionário': row['Turno Vespertino'] or '-'
-                        })
-                    
-                    cal_df = pd.DataFrame(cal_data)
-                    
-                    # Criar um heatmap da escala
-                    heatmap = alt.Chart(cal_df).mark_rect().encode(
-                        x=alt.X('Dia:O', title='Dia do Mês'),
-                        y=alt.Y('Turno:N', title=None),
-                        color=alt.Color('Funcionário:N', legend=alt.Legend(orient='bottom')),
-                        tooltip=['Dia', 'Turno', 'Funcionário']
-                    ).properties(
-                        title=f"Escala de {calendar.month_name[mes]} de {ano}",
-                        width=600
-                    )
-                    
-                    # Adicionar rótulos
-                    text = alt.Chart(cal_df).mark_text().encode(
-                        x=alt.X('Dia:O'),
-                        y=alt.Y('Turno:N'),
-                        text='Funcionário',
-                        color=alt.condition(
-                            alt.datum.Funcionário == '-',
-                            alt.value('red'),
-                            alt.value('white')
-                        )
-                    )
-                    
-                    st.altair_chart(heatmap + text, use_container_width=True)
-                    
-                    # Adicionar legenda de turnos
-                    st.info("**Matutino**: Turno da manhã | **Vespertino**: Turno da tarde")
+            st.dataframe(salvas, hide_index=True, use_container_width=True)
+            st.selectbox(
+                "Escala salva",
+                [(equipe, int(ano_salvo), int(mes_salvo))
+                 for equipe, ano_salvo, mes_salvo in salvas[["equipe", "ano", "mes"]].itertuples(index=False)],
+                format_func=lambda opcao: f"{opcao[0]} — {opcao[2]:02d}/{opcao[1]}",
+                key="escala_salva"
+            )
+            st.button("📂 Abrir escala salva", on_click=carregar_escala_salva,
+                      help="Substitui a escala atual pela escala salva, para exibir, exportar ou validar.")
+        
+        dia_consulta = st.date_input("Quem trabalha no dia", value=date.today(), format="DD/MM/YYYY")
+        st.dataframe(banco.quem_trabalha(dia_consulta), hide_index=True, use_container_width=True)
+        
+        funcionario_consulta = st.text_input(f"Turnos do funcionário em {ano}").strip()
+        if funcionario_consulta:
+            st.dataframe(banco.turnos_do_funcionario(funcionario_consulta, date(ano, 1, 1), date(ano, 12, 31)),
+                         hide_index=True, use_container_width=True)
+        
+        st.caption(f"Turnos por funcionário em {calendar.month_name[mes]}/{ano}")
+        st.dataframe(banco.carga_no_periodo(date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])),
+                     hide_index=True, use_container_width=True)
+
+# Painel de diagnóstico com os tempos desta execução do script e os da última geração (feita em segundo plano)
+if medidor is not MEDIDOR_INATIVO:
+    with st.expander("Diagnóstico de desempenho", expanded=True):
+        paineis = [("Execução do script", "execucao", medidor)]
+        if st.session_state.get("medidor_geracao", MEDIDOR_INATIVO) is not MEDIDOR_INATIVO:
+            paineis.append(("Última geração", "geracao", st.session_state["medidor_geracao"]))
+        
+        for titulo, nome, medidor_painel in paineis:
+            st.markdown(f"**{titulo}**")
+            diagnostico = medidor_painel.como_dict()
+            st.dataframe(
+                pd.DataFrame(list(diagnostico["tempos_ms"].items()), columns=["Fase", "Tempo (ms)"]),
+                hide_index=True,
+                use_container_width=True
+            )
+            st.json(diagnostico["contadores"])
+            st.download_button(
+                label="📄 Baixar diagnóstico (JSON)",
+                data=medidor_painel.como_json(),
+                file_name=f"diagnostico_{nome}.json",
+                mime="application/json",
+                on_click="ignore",
+                key=f"diagnostico_{nome}"
+            )
+            if medidor_painel.perfil:
+                st.code(medidor_painel.perfil)
+                st.download_button(
+                    label="📄 Baixar perfil (.prof)",
+                    data=medidor_painel.perfil_binario,
+                    file_name="perfil.prof",
+                    mime="application/octet-stream",
+                    on_click="ignore",
+                    key=f"perfil_{nome}"
+                )
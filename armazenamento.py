@@ -0,0 +1,281 @@
+# Persistência em SQLite de equipes, restrições e escalas geradas
+# As restrições ficam uma por linha (o formato de COLUNAS_RESTRICOES) e voltam em bloco para as estruturas do gerador;
+# os turnos das escalas geradas ficam indexados por (data, turno) e por (funcionario, data), de modo que consultas
+# entre meses e equipes ("quem trabalha no dia X?") são respondidas sem gerar nada de novo
+import sqlite3
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from escala import (
+    CANDIDATOS_PADRAO, COLUNAS_RESTRICOES, EscalaColunar, estruturas_de_restricoes, linhas_de_restricoes,
+    normalizar_restricoes
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS equipes (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE,
+    considerar_carga INTEGER NOT NULL DEFAULT 1,
+    metodo TEXT NOT NULL DEFAULT 'guloso',
+    tempo_limite REAL NOT NULL DEFAULT 10.0,
+    candidatos INTEGER NOT NULL DEFAULT 1000,
+    semente INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS funcionarios (
+    equipe_id INTEGER NOT NULL REFERENCES equipes (id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    PRIMARY KEY (equipe_id, posicao)
+);
+CREATE TABLE IF NOT EXISTS restricoes (
+    equipe_id INTEGER NOT NULL REFERENCES equipes (id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    funcionario TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    dia INTEGER NOT NULL,
+    dia_fim INTEGER,
+    turno TEXT,
+    PRIMARY KEY (equipe_id, posicao)
+);
+CREATE TABLE IF NOT EXISTS escalas (
+    id INTEGER PRIMARY KEY,
+    equipe_id INTEGER NOT NULL REFERENCES equipes (id) ON DELETE CASCADE,
+    ano INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    chave TEXT,
+    gerada_em TEXT NOT NULL,
+    UNIQUE (equipe_id, ano, mes)
+);
+CREATE TABLE IF NOT EXISTS turnos (
+    escala_id INTEGER NOT NULL REFERENCES escalas (id) ON DELETE CASCADE,
+    data TEXT NOT NULL,
+    turno TEXT NOT NULL,
+    funcionario TEXT,
+    PRIMARY KEY (escala_id, data, turno)
+);
+CREATE INDEX IF NOT EXISTS turnos_data_turno ON turnos (data, turno);
+CREATE INDEX IF NOT EXISTS turnos_funcionario_data ON turnos (funcionario, data);
+CREATE TABLE IF NOT EXISTS cargas (
+    escala_id INTEGER NOT NULL REFERENCES escalas (id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    funcionario TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (escala_id, posicao)
+);
+"""
+
+# Turnos com a equipe de cada um; base das consultas entre meses e equipes
+CONSULTA_TURNOS = """
+SELECT equipes.nome AS equipe, turnos.data, turnos.turno, turnos.funcionario
+FROM turnos
+JOIN escalas ON escalas.id = turnos.escala_id
+JOIN equipes ON equipes.id = escalas.equipe_id
+"""
+
+# Datas como texto AAAA-MM-DD (a ordem do texto é a ordem das datas)
+def texto_data(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime("%Y-%m-%d")
+    return str(valor)
+
+
+class BancoDeEscalas:
+    # caminho: arquivo do banco SQLite (criado se não existir); ":memory:" mantém tudo na memória
+    def __init__(self, caminho="mpescalas.db"):
+        self.caminho = str(caminho)
+        self.conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+        self.trava = threading.Lock()
+        with self.trava:
+            self.conexao.execute("PRAGMA foreign_keys = ON")
+            if self.caminho != ":memory:":
+                self.conexao.execute("PRAGMA journal_mode = WAL")
+            self.conexao.executescript(ESQUEMA)
+    
+    def fechar(self):
+        with self.trava:
+            self.conexao.close()
+    
+    def _id_equipe(self, nome):
+        linha = self.conexao.execute("SELECT id FROM equipes WHERE nome = ?", (nome,)).fetchone()
+        if linha is None:
+            raise KeyError(f"Equipe não encontrada: {nome}")
+        return linha[0]
+    
+    def _consultar(self, sql, parametros=()):
+        with self.trava:
+            return pd.read_sql_query(sql, self.conexao, params=parametros)
+    
+    # Gravar (ou substituir) os funcionários, as restrições e as opções de geração de uma equipe
+    # As escalas já salvas da equipe são mantidas
+    def salvar_equipe(self, nome, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True, metodo="guloso",
+                      tempo_limite=10.0, candidatos=CANDIDATOS_PADRAO, semente=0):
+        restricoes = linhas_de_restricoes(excecoes, alocacoes_fixas)
+        with self.trava, self.conexao:
+            self.conexao.execute(
+                """INSERT INTO equipes (nome, considerar_carga, metodo, tempo_limite, candidatos, semente)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (nome) DO UPDATE SET considerar_carga = excluded.considerar_carga,
+                       metodo = excluded.metodo, tempo_limite = excluded.tempo_limite,
+                       candidatos = excluded.candidatos, semente = excluded.semente""",
+                (nome, int(bool(considerar_carga)), metodo, float(tempo_limite), int(candidatos), int(semente))
+            )
+            equipe_id = self._id_equipe(nome)
+            self.conexao.execute("DELETE FROM funcionarios WHERE equipe_id = ?", (equipe_id,))
+            self.conexao.execute("DELETE FROM restricoes WHERE equipe_id = ?", (equipe_id,))
+            self.conexao.executemany(
+                "INSERT INTO funcionarios (equipe_id, posicao, nome) VALUES (?, ?, ?)",
+                [(equipe_id, posicao, funcionario) for posicao, funcionario in enumerate(funcionarios)]
+            )
+            # A posição preserva a ordem, que decide a prioridade entre alocações fixas concorrentes
+            self.conexao.executemany(
+                "INSERT INTO restricoes (equipe_id, posicao, funcionario, tipo, dia, dia_fim, turno) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(equipe_id, posicao, *linha) for posicao, linha in enumerate(restricoes)]
+            )
+    
+    # Salvar as equipes carregadas por escala.carregar_equipe (ou no mesmo formato)
+    def salvar_equipes(self, equipes):
+        for equipe in equipes:
+            self.salvar_equipe(
+                equipe['nome'], equipe['funcionarios'], equipe['excecoes'], equipe['alocacoes_fixas'],
+                equipe['considerar_carga'], equipe['metodo'], equipe['tempo_limite'],
+                equipe.get('candidatos', CANDIDATOS_PADRAO), equipe.get('semente', 0)
+            )
+    
+    def equipes(self):
+        with self.trava:
+            return [nome for (nome,) in self.conexao.execute("SELECT nome FROM equipes ORDER BY nome")]
+    
+    # Tabela de restrições da equipe (normalizada, na ordem em que foi salva), uma linha por restrição
+    def restricoes(self, nome):
+        with self.trava:
+            equipe_id = self._id_equipe(nome)
+            tabela = pd.read_sql_query(
+                f"SELECT {', '.join(COLUNAS_RESTRICOES)} FROM restricoes WHERE equipe_id = ? ORDER BY posicao",
+                self.conexao, params=(equipe_id,)
+            )
+        return normalizar_restricoes(tabela)
+    
+    # Configuração da equipe no formato de escala.carregar_equipe, com as restrições convertidas em bloco
+    def carregar_equipe(self, nome):
+        tabela = self.restricoes(nome)
+        with self.trava:
+            equipe_id = self._id_equipe(nome)
+            funcionarios = [
+                funcionario for (funcionario,) in self.conexao.execute(
+                    "SELECT nome FROM funcionarios WHERE equipe_id = ? ORDER BY posicao", (equipe_id,)
+                )
+            ]
+            considerar_carga, metodo, tempo_limite, candidatos, semente = self.conexao.execute(
+                "SELECT considerar_carga, metodo, tempo_limite, candidatos, semente FROM equipes WHERE id = ?",
+                (equipe_id,)
+            ).fetchone()
+        _, excecoes, alocacoes_fixas = estruturas_de_restricoes(tabela)
+        return {
+            'nome': nome,
+            'funcionarios': funcionarios,
+            'excecoes': excecoes,
+            'alocacoes_fixas': alocacoes_fixas,
+            'considerar_carga': bool(considerar_carga),
+            'metodo': metodo,
+            'tempo_limite': tempo_limite,
+            'candidatos': candidatos,
+            'semente': semente,
+        }
+    
+    # Gravar (ou substituir) a escala de um mês da equipe; chave é a chave de configuração que a gerou, se houver
+    def salvar_escala(self, equipe, escala, chave=None):
+        datas = [f"{escala.ano:04d}-{escala.mes:02d}-{dia:02d}" for dia in escala.dias.tolist()]
+        # O código -1 (turno vago) cai no último elemento, None
+        rotulos = np.append(escala.nomes.to_numpy(dtype=object), None)
+        
+        with self.trava, self.conexao:
+            equipe_id = self._id_equipe(equipe)
+            self.conexao.execute(
+                "DELETE FROM escalas WHERE equipe_id = ? AND ano = ? AND mes = ?", (equipe_id, escala.ano, escala.mes)
+            )
+            escala_id = self.conexao.execute(
+                "INSERT INTO escalas (equipe_id, ano, mes, chave, gerada_em) VALUES (?, ?, ?, ?, ?)",
+                (equipe_id, escala.ano, escala.mes, chave, datetime.now().isoformat(timespec="seconds"))
+            ).lastrowid
+            for turno, codigos in (('Matutino', escala.matutino), ('Vespertino', escala.vespertino)):
+                self.conexao.executemany(
+                    "INSERT INTO turnos (escala_id, data, turno, funcionario) VALUES (?, ?, ?, ?)",
+                    zip([escala_id] * len(datas), datas, [turno] * len(datas), rotulos[codigos].tolist())
+                )
+            self.conexao.executemany(
+                "INSERT INTO cargas (escala_id, posicao, funcionario, total) VALUES (?, ?, ?, ?)",
+                [(escala_id, posicao, funcionario, total)
+                 for posicao, (funcionario, total) in enumerate(zip(escala.nomes.tolist(), escala.carga.tolist()))]
+            )
+    
+    # Escala salva de um mês da equipe, em formato colunar (None se não houver)
+    def carregar_escala(self, equipe, mes, ano):
+        with self.trava:
+            linha = self.conexao.execute(
+                "SELECT escalas.id FROM escalas JOIN equipes ON equipes.id = escalas.equipe_id "
+                "WHERE equipes.nome = ? AND escalas.ano = ? AND escalas.mes = ?", (equipe, ano, mes)
+            ).fetchone()
+            if linha is None:
+                return None
+            turnos = pd.read_sql_query(
+                "SELECT data, turno, funcionario FROM turnos WHERE escala_id = ? ORDER BY data", self.conexao,
+                params=(linha[0],)
+            )
+            cargas = pd.read_sql_query(
+                "SELECT funcionario, total FROM cargas WHERE escala_id = ? ORDER BY posicao", self.conexao,
+                params=(linha[0],)
+            )
+        
+        nomes = pd.Index(cargas['funcionario'].tolist(), dtype=object)
+        tipo = np.int16 if len(nomes) < np.iinfo(np.int16).max else np.int32
+        matutino, vespertino = (
+            turnos[turnos['turno'] == turno].reset_index(drop=True) for turno in ('Matutino', 'Vespertino')
+        )
+        datas = pd.to_datetime(matutino['data'], format="%Y-%m-%d")
+        return EscalaColunar(
+            mes, ano,
+            datas.dt.day.to_numpy(dtype=np.int8),
+            datas.dt.weekday.to_numpy(dtype=np.int8),
+            nomes.get_indexer(matutino['funcionario'].astype(object)).astype(tipo),
+            nomes.get_indexer(vespertino['funcionario'].astype(object)).astype(tipo),
+            nomes,
+            cargas['total'].to_numpy(dtype=np.int64),
+        )
+    
+    # Escalas salvas (equipe, ano, mês, data de geração)
+    def escalas_salvas(self):
+        return self._consultar(
+            "SELECT equipes.nome AS equipe, escalas.ano, escalas.mes, escalas.gerada_em FROM escalas "
+            "JOIN equipes ON equipes.id = escalas.equipe_id ORDER BY equipes.nome, escalas.ano, escalas.mes"
+        )
+    
+    # Quem trabalha entre inicio e fim (inclusive; por padrão só no dia inicio), em todas as equipes
+    # Usa o índice (data, turno)
+    def quem_trabalha(self, inicio, fim=None, turno=None):
+        sql = CONSULTA_TURNOS + "WHERE turnos.data BETWEEN ? AND ? AND turnos.funcionario IS NOT NULL"
+        parametros = [texto_data(inicio), texto_data(fim if fim is not None else inicio)]
+        if turno is not None:
+            sql += " AND turnos.turno = ?"
+            parametros.append(turno)
+        return self._consultar(sql + " ORDER BY turnos.data, turnos.turno, equipes.nome", parametros)
+    
+    # Turnos de um funcionário entre inicio e fim (inclusive), em todas as equipes; usa o índice (funcionario, data)
+    def turnos_do_funcionario(self, funcionario, inicio="0000-01-01", fim="9999-12-31"):
+        return self._consultar(
+            CONSULTA_TURNOS + "WHERE turnos.funcionario = ? AND turnos.data BETWEEN ? AND ? "
+            "ORDER BY turnos.data, turnos.turno",
+            (funcionario, texto_data(inicio), texto_data(fim))
+        )
+    
+    # Total de turnos por equipe e funcionário entre inicio e fim (inclusive)
+    def carga_no_periodo(self, inicio, fim):
+        return self._consultar(
+            "SELECT equipe, funcionario, COUNT(*) AS turnos FROM (" + CONSULTA_TURNOS +
+            "WHERE turnos.data BETWEEN ? AND ? AND turnos.funcionario IS NOT NULL) "
+            "GROUP BY equipe, funcionario ORDER BY equipe, turnos DESC, funcionario",
+            (texto_data(inicio), texto_data(fim))
+        )
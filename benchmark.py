@@ -0,0 +1,174 @@
+# Benchmark de gerar_escala com cargas sintéticas
+#
+# Uso:
+#   python benchmark.py                                   # cenários padrão, resultados em benchmark.json
+#   python benchmark.py --funcionarios 50,400 --meses 12 --densidade 0.2 --fixas 10
+#   python benchmark.py --densidade 0.1 --densidade-intervalos 0.6   # densidade própria para uma categoria
+#   python benchmark.py --gravar-base base.json           # guarda a linha de base
+#   python benchmark.py --base base.json --limite 1.3     # falha se alguma fase ficar 30% mais lenta
+#
+# Cada cenário mede separadamente: a geração (gerar_escala_colunar), a montagem dos DataFrames
+# de escala e estatísticas e a preparação dos dados do calendário (cal_df e agregação semanal).
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+from escala import (
+    CANDIDATOS_PADRAO, COLUNAS_RESTRICOES, estruturas_de_restricoes, gerar_escala_colunar, normalizar_restricoes
+)
+from visualizacao import calendario_longo, carga_semanal
+
+CATEGORIAS = ['dias_especificos', 'intervalos', 'dias_semana', 'turnos']
+FASES = ['geracao', 'dataframes', 'calendario']
+
+# Configuração sintética de uma equipe para um mês
+# densidade: fração dos funcionários com cada categoria de exceção (número ou dicionário por categoria)
+# fixas: quantidade de funcionários com alocação fixa (metade por dia da semana, metade por dia do mês)
+def configuracao_sintetica(funcionarios, densidade=0.1, fixas=0, semente=0):
+    aleatorio = random.Random(semente)
+    if not isinstance(densidade, dict):
+        densidade = dict.fromkeys(CATEGORIAS, densidade)
+    nomes = [f"Funcionário {i + 1:04d}" for i in range(funcionarios)]
+    turnos = ['Matutino', 'Vespertino']
+    linhas = []
+    
+    for nome in nomes:
+        if aleatorio.random() < densidade.get('dias_especificos', 0):
+            for dia in aleatorio.sample(range(1, 29), 3):
+                linhas.append((nome, 'folga_dia', dia, None, None))
+        if aleatorio.random() < densidade.get('intervalos', 0):
+            inicio = aleatorio.randint(1, 24)
+            linhas.append((nome, 'folga_intervalo', inicio, inicio + aleatorio.randint(0, 6), None))
+        if aleatorio.random() < densidade.get('dias_semana', 0):
+            linhas.append((nome, 'folga_dia_semana', aleatorio.randrange(5), None, None))
+        if aleatorio.random() < densidade.get('turnos', 0):
+            for dia in aleatorio.sample(range(1, 29), 2):
+                linhas.append((nome, 'folga_turno', dia, None, aleatorio.choice(turnos)))
+    
+    for i, nome in enumerate(aleatorio.sample(nomes, min(fixas, funcionarios))):
+        if i % 2:
+            linhas.append((nome, 'fixo_dia', aleatorio.randint(1, 28), None, aleatorio.choice(turnos)))
+        else:
+            linhas.append((nome, 'fixo_dia_semana', aleatorio.randrange(5), None, aleatorio.choice(turnos)))
+    
+    tabela = normalizar_restricoes(pd.DataFrame(linhas, columns=COLUNAS_RESTRICOES))
+    _, excecoes, alocacoes_fixas = estruturas_de_restricoes(tabela)
+    return nomes, excecoes, alocacoes_fixas
+
+# Medir as fases de um cenário; cada fase soma o tempo de todos os meses do horizonte
+# Retorna a mediana, em segundos, de cada fase entre as repetições
+def medir_cenario(funcionarios, densidade, fixas, meses, ano=2026, metodo="guloso", repeticoes=5,
+                  candidatos=CANDIDATOS_PADRAO):
+    configuracoes = [
+        (mes, configuracao_sintetica(funcionarios, densidade, fixas, semente=mes))
+        for mes in range(1, meses + 1)
+    ]
+    amostras = {fase: [] for fase in FASES}
+    
+    for _ in range(repeticoes):
+        tempos = dict.fromkeys(FASES, 0.0)
+        for mes, (nomes, excecoes, alocacoes_fixas) in configuracoes:
+            inicio = time.perf_counter()
+            escala = gerar_escala_colunar(mes, ano, nomes, excecoes, alocacoes_fixas, metodo=metodo,
+                                          candidatos=candidatos)
+            tempos['geracao'] += time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            escala.tabela()
+            escala.estatisticas()
+            tempos['dataframes'] += time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            carga_semanal(calendario_longo(escala), mes, ano)
+            tempos['calendario'] += time.perf_counter() - inicio
+        for fase in FASES:
+            amostras[fase].append(tempos[fase])
+    
+    return {fase: statistics.median(valores) for fase, valores in amostras.items()}
+
+# Densidade no nome do cenário: um número, ou categoria=valor para cada categoria de um dicionário
+def texto_densidade(densidade):
+    if isinstance(densidade, dict):
+        return ",".join(f"{categoria}={densidade.get(categoria, 0):g}" for categoria in CATEGORIAS)
+    return f"{densidade:g}"
+
+def nome_cenario(funcionarios, densidade, fixas, meses, metodo):
+    return f"{metodo}-f{funcionarios}-d{texto_densidade(densidade)}-x{fixas}-m{meses}"
+
+# Comparar com a linha de base; devolve as fases que passaram de limite vezes o tempo de referência
+def regressoes(resultados, base, limite):
+    encontradas = []
+    for cenario, fases in resultados.items():
+        for fase, tempo in fases.items():
+            referencia = base.get(cenario, {}).get(fase)
+            if referencia and tempo > referencia * limite:
+                encontradas.append((cenario, fase, referencia, tempo))
+    return encontradas
+
+def lista_inteiros(texto):
+    return [int(x) for x in texto.split(',') if x.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de gerar_escala com cargas sintéticas.")
+    parser.add_argument("--funcionarios", type=lista_inteiros, default=[20, 100, 400],
+                        help="Tamanhos de equipe, separados por vírgula (padrão: 20,100,400)")
+    parser.add_argument("--densidade", type=float, default=0.2,
+                        help="Fração dos funcionários com cada categoria de exceção (padrão: 0.2)")
+    for categoria in CATEGORIAS:
+        parser.add_argument(f"--densidade-{categoria.replace('_', '-')}", dest=f"densidade_{categoria}", type=float,
+                            help=f"Fração dos funcionários com exceções em {categoria} (padrão: --densidade)")
+    parser.add_argument("--fixas", type=int, default=5, help="Funcionários com alocação fixa (padrão: 5)")
+    parser.add_argument("--meses", type=lista_inteiros, default=[1, 12],
+                        help="Horizontes, em meses, separados por vírgula (padrão: 1,12)")
+    parser.add_argument("--metodo", choices=["guloso", "otimo", "candidatos"], default="guloso")
+    parser.add_argument("--candidatos", type=int, default=CANDIDATOS_PADRAO,
+                        help=f"Escalas candidatas no método candidatos (padrão: {CANDIDATOS_PADRAO})")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições por cenário (padrão: 5)")
+    parser.add_argument("--saida", default="benchmark.json", help="Arquivo JSON de resultados")
+    parser.add_argument("--base", help="Linha de base (JSON) para detectar regressões")
+    parser.add_argument("--limite", type=float, default=1.25,
+                        help="Razão máxima aceita entre o tempo atual e o da base (padrão: 1.25)")
+    parser.add_argument("--gravar-base", metavar="ARQUIVO", help="Gravar os resultados também como linha de base")
+    args = parser.parse_args(argv)
+    
+    # Com alguma densidade por categoria, o cenário usa um dicionário; as demais categorias ficam com --densidade
+    por_categoria = {categoria: getattr(args, f"densidade_{categoria}") for categoria in CATEGORIAS}
+    densidade = args.densidade
+    if any(valor is not None for valor in por_categoria.values()):
+        densidade = {categoria: args.densidade if valor is None else valor for categoria, valor in por_categoria.items()}
+    
+    resultados = {}
+    for meses in args.meses:
+        for funcionarios in args.funcionarios:
+            cenario = nome_cenario(funcionarios, densidade, args.fixas, meses, args.metodo)
+            resultados[cenario] = medir_cenario(
+                funcionarios, densidade, args.fixas, meses, metodo=args.metodo, repeticoes=args.repeticoes,
+                candidatos=args.candidatos
+            )
+            tempos = "  ".join(f"{fase}={tempo * 1000:.1f}ms" for fase, tempo in resultados[cenario].items())
+            print(f"{cenario:<32} {tempos}")
+    
+    for arquivo in filter(None, [args.saida, args.gravar_base]):
+        with open(arquivo, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+    
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        encontradas = regressoes(resultados, base, args.limite)
+        for cenario, fase, referencia, tempo in encontradas:
+            print(f"[regressão] {cenario} {fase}: {referencia * 1000:.1f}ms -> {tempo * 1000:.1f}ms "
+                  f"({tempo / referencia:.2f}x)", file=sys.stderr)
+        if encontradas:
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
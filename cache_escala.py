@@ -0,0 +1,147 @@
+# Cache de escalas geradas, indexado por um hash canônico da configuração
+# Camada em memória (LRU, por processo) e camada opcional em disco, com remoção por tamanho
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from diagnostico import MEDIDOR_INATIVO
+from escala import CANDIDATOS_PADRAO, EscalaColunar, gerar_escala_colunar
+
+
+# Dias e turnos de um bloco de alocação fixa (escala.blocos_fixos), ordenados
+def bloco_canonico(bloco):
+    return [sorted(set(bloco.get('dias', []))), sorted(set(bloco.get('turnos', [])))]
+
+# Forma canônica (serializável em JSON) dos parâmetros de gerar_escala
+# As exceções só são consultadas por pertinência, então chaves e listas são ordenadas;
+# nas alocações fixas a ordem dos funcionários decide quem ocupa o turno, e por isso é mantida
+def forma_canonica(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True,
+                   metodo="guloso", tempo_limite=10.0, candidatos=CANDIDATOS_PADRAO, semente=0):
+    return {
+        'mes': mes,
+        'ano': ano,
+        'funcionarios': list(funcionarios),
+        'excecoes': {
+            'dias_especificos': sorted([dia, f] for (dia, f) in excecoes.get('dias_especificos', {})),
+            'intervalos': sorted([f, sorted([i[0], i[1]] for i in intervalos)]
+                                 for f, intervalos in excecoes.get('intervalos', {}).items()),
+            'dias_semana': sorted([f, sorted(set(dias))] for f, dias in excecoes.get('dias_semana', {}).items()),
+            'turnos': sorted([dia, turno, sorted(set(nomes))]
+                             for (dia, turno), nomes in excecoes.get('turnos', {}).items()),
+        },
+        'alocacoes_fixas': {
+            categoria: [[f, *bloco_canonico(detalhes)] if not isinstance(detalhes, list)
+                        else [f, sorted(bloco_canonico(bloco) for bloco in detalhes)]
+                        for f, detalhes in alocacoes_fixas.get(categoria, {}).items()]
+            for categoria in ('dia_semana', 'dias_especificos')
+        },
+        'considerar_carga': bool(considerar_carga),
+        'metodo': metodo,
+        'tempo_limite': float(tempo_limite) if metodo == "otimo" else None,
+        'candidatos': int(candidatos) if metodo == "candidatos" else None,
+        'semente': semente if metodo == "candidatos" else None,
+    }
+
+# Hash estável (SHA-256) da forma canônica
+def chave_configuracao(*args, **kwargs):
+    texto = json.dumps(forma_canonica(*args, **kwargs), ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheDeEscalas:
+    # capacidade: número de escalas na memória; diretorio: camada em disco (None desativa);
+    # limite_disco: tamanho máximo, em bytes, dos arquivos em disco
+    def __init__(self, capacidade=32, diretorio=None, limite_disco=100 * 1024 * 1024):
+        self.capacidade = capacidade
+        self.diretorio = Path(diretorio) if diretorio else None
+        self.limite_disco = limite_disco
+        self.memoria = OrderedDict()
+        self.trava = threading.Lock()
+        if self.diretorio:
+            self.diretorio.mkdir(parents=True, exist_ok=True)
+    
+    # Como gerar_escala_colunar; o cache guarda só a forma colunar, bem menor que os DataFrames legíveis
+    def gerar_colunar(self, mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True,
+                      metodo="guloso", tempo_limite=10.0, medidor=MEDIDOR_INATIVO, progresso=None,
+                      candidatos=CANDIDATOS_PADRAO, semente=0, executor_processos=None):
+        with medidor.fase("cache"):
+            chave = chave_configuracao(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga,
+                                       metodo, tempo_limite, candidatos, semente)
+            escala = self.obter(chave)
+        medidor.definir("cache_acerto", escala is not None)
+        if escala is None:
+            escala = gerar_escala_colunar(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga,
+                                          metodo=metodo, tempo_limite=tempo_limite, medidor=medidor,
+                                          progresso=progresso, candidatos=candidatos, semente=semente,
+                                          executor_processos=executor_processos)
+            # Um método ótimo que esgotou o tempo devolve a escala gulosa: não é o resultado desta chave
+            if not escala.prazo_esgotado:
+                self.guardar(chave, escala)
+        return escala
+    
+    def obter(self, chave):
+        with self.trava:
+            if chave in self.memoria:
+                self.memoria.move_to_end(chave)
+                return self.memoria[chave]
+        
+        resultado = self._ler_disco(chave)
+        if resultado is not None:
+            with self.trava:
+                self._guardar_memoria(chave, resultado)
+        return resultado
+    
+    def guardar(self, chave, resultado):
+        with self.trava:
+            self._guardar_memoria(chave, resultado)
+        self._gravar_disco(chave, resultado)
+    
+    def _guardar_memoria(self, chave, resultado):
+        self.memoria[chave] = resultado
+        self.memoria.move_to_end(chave)
+        while len(self.memoria) > self.capacidade:
+            self.memoria.popitem(last=False)
+    
+    def _ler_disco(self, chave):
+        if not self.diretorio:
+            return None
+        arquivo = self.diretorio / f"{chave}.pkl"
+        try:
+            with open(arquivo, 'rb') as f:
+                resultado = pickle.load(f)
+            os.utime(arquivo)  # Marca o uso recente para a remoção por tamanho
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        # Arquivos gravados por versões anteriores (outro formato) são ignorados
+        return resultado if isinstance(resultado, EscalaColunar) else None
+    
+    def _gravar_disco(self, chave, resultado):
+        if not self.diretorio:
+            return
+        # Escrita atômica: outras sessões nunca leem um arquivo pela metade
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        with os.fdopen(descritor, 'wb') as f:
+            pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, self.diretorio / f"{chave}.pkl")
+        self._remover_excesso()
+    
+    # Remove os arquivos usados há mais tempo até o diretório caber em limite_disco
+    def _remover_excesso(self):
+        arquivos = []
+        for arquivo in self.diretorio.glob('*.pkl'):
+            try:
+                info = arquivo.stat()
+            except OSError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, arquivo))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, arquivo in sorted(arquivos, key=lambda a: a[0]):
+            if total <= self.limite_disco:
+                break
+            arquivo.unlink(missing_ok=True)
+            total -= tamanho
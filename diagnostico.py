@@ -0,0 +1,88 @@
+# Instrumentação por fase (tempos e contadores) e captura opcional de perfil com cProfile
+# Desativada, a instrumentação usa MEDIDOR_INATIVO, cujos métodos não fazem nada
+import cProfile
+import io
+import json
+import pstats
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Medidor:
+    def __init__(self):
+        self.tempos = {}       # Segundos acumulados por fase, na ordem em que as fases aparecem
+        self.contadores = {}
+        self.abertas = {}
+        self.perfil = None     # Texto do pstats, quando houver captura com cProfile
+        self.perfil_binario = None
+    
+    def iniciar(self, fase):
+        self.abertas[fase] = time.perf_counter()
+    
+    def encerrar(self, fase):
+        inicio = self.abertas.pop(fase, None)
+        if inicio is not None:
+            self.tempos[fase] = self.tempos.get(fase, 0.0) + time.perf_counter() - inicio
+    
+    @contextmanager
+    def fase(self, nome):
+        self.iniciar(nome)
+        try:
+            yield
+        finally:
+            self.encerrar(nome)
+    
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+    
+    def definir(self, nome, valor):
+        self.contadores[nome] = valor
+    
+    # Executar funcao(*args, **kwargs) sob cProfile, guardando o relatório (top 40 por tempo acumulado)
+    def perfilar(self, funcao, *args, **kwargs):
+        perfil = cProfile.Profile()
+        resultado = perfil.runcall(funcao, *args, **kwargs)
+        
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(40)
+        self.perfil = texto.getvalue()
+        with tempfile.NamedTemporaryFile(suffix=".prof") as arquivo:
+            perfil.dump_stats(arquivo.name)
+            self.perfil_binario = arquivo.read()
+        return resultado
+    
+    def como_dict(self):
+        return {
+            "tempos_ms": {fase: round(segundos * 1000, 3) for fase, segundos in self.tempos.items()},
+            "contadores": dict(self.contadores),
+        }
+    
+    def como_json(self):
+        return json.dumps(self.como_dict(), ensure_ascii=False, indent=2)
+
+
+class MedidorInativo:
+    perfil = None
+    perfil_binario = None
+    
+    def iniciar(self, fase):
+        pass
+    
+    def encerrar(self, fase):
+        pass
+    
+    def fase(self, nome):
+        return nullcontext()
+    
+    def contar(self, nome, quantidade=1):
+        pass
+    
+    def definir(self, nome, valor):
+        pass
+    
+    def perfilar(self, funcao, *args, **kwargs):
+        return funcao(*args, **kwargs)
+
+
+MEDIDOR_INATIVO = MedidorInativo()
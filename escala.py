@@ -0,0 +1,1000 @@
+# Núcleo de geração de escalas, sem dependência do Streamlit
+# Usado pela interface (app.py) e pela geração em lote (lote.py)
+import calendar
+import heapq
+import json
+import os
+import random
+import time
+from concurrent.futures import as_completed
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from diagnostico import MEDIDOR_INATIVO
+
+# Máscara de posições por nome (nomes repetidos ocupam mais de uma posição)
+def mascaras_por_nome(funcionarios):
+    posicoes = {}
+    for i, funcionario in enumerate(funcionarios):
+        posicoes[funcionario] = posicoes.get(funcionario, 0) | (1 << i)
+    return posicoes
+
+# Blocos de uma alocação fixa: cada bloco {'dias': [...], 'turnos': [...]} fixa todos os seus dias em todos os seus turnos
+# Um funcionário tem um único bloco (o formato da interface) ou uma lista deles, quando os turnos variam de um dia para outro
+def blocos_fixos(detalhes):
+    return detalhes if isinstance(detalhes, list) else [detalhes]
+
+# Alocação fixa de um funcionário a partir dos pares (dia, turno) das linhas da tabela de restrições
+# Se os pares formam o produto dos dias pelos turnos, resulta num único bloco; senão, os dias são agrupados
+# pelos turnos que fixam, e cada grupo vira um bloco
+def alocacao_fixa_de_pares(dias, turnos):
+    pares = list(dict.fromkeys(zip(dias, turnos)))
+    dias_unicos = list(dict.fromkeys(dias))
+    turnos_unicos = list(dict.fromkeys(turnos))
+    if len(pares) == len(dias_unicos) * len(turnos_unicos):
+        return {'dias': dias_unicos, 'turnos': turnos_unicos}
+    
+    turnos_por_dia = {}
+    for dia, turno in pares:
+        turnos_por_dia.setdefault(dia, []).append(turno)
+    blocos = {}
+    for dia, turnos_do_dia in turnos_por_dia.items():
+        blocos.setdefault(tuple(turnos_do_dia), []).append(dia)
+    return [{'dias': dias_do_bloco, 'turnos': list(turnos_do_bloco)} for turnos_do_bloco, dias_do_bloco in blocos.items()]
+
+# Compilar exceções e alocações fixas num índice de disponibilidade
+# Cada (dia, turno) recebe uma máscara de bits onde o bit i indica que funcionarios[i] está disponível
+def compilar_disponibilidade(funcionarios, dias_uteis, dias_semana_no_mes, excecoes, alocacoes_fixas):
+    posicoes = mascaras_por_nome(funcionarios)
+    todos = (1 << len(funcionarios)) - 1
+    bloqueio_dia = {dia: 0 for dia in dias_uteis}
+    bloqueio_turno = {(dia, turno): 0 for dia in dias_uteis for turno in ('Matutino', 'Vespertino')}
+    
+    # Exceções por dia específico
+    for (dia, funcionario) in excecoes.get('dias_especificos', {}):
+        if dia in bloqueio_dia:
+            bloqueio_dia[dia] |= posicoes.get(funcionario, 0)
+    
+    # Exceções por intervalo de dias
+    for funcionario, intervalos in excecoes.get('intervalos', {}).items():
+        mascara = posicoes.get(funcionario, 0)
+        if not mascara:
+            continue
+        for intervalo in intervalos:
+            for dia in dias_uteis:
+                if intervalo[0] <= dia <= intervalo[1]:
+                    bloqueio_dia[dia] |= mascara
+    
+    # Exceções por dia da semana
+    for funcionario, dias_semana in excecoes.get('dias_semana', {}).items():
+        mascara = posicoes.get(funcionario, 0)
+        if not mascara:
+            continue
+        for dia in dias_uteis:
+            if dias_semana_no_mes[dia] in dias_semana:
+                bloqueio_dia[dia] |= mascara
+    
+    # Exceções por turno específico
+    for chave, nomes in excecoes.get('turnos', {}).items():
+        if chave in bloqueio_turno:
+            for funcionario in nomes:
+                bloqueio_turno[chave] |= posicoes.get(funcionario, 0)
+    
+    disponibilidade = {
+        (dia, turno): todos & ~(bloqueio_dia[dia] | bloqueio_turno[(dia, turno)])
+        for (dia, turno) in bloqueio_turno
+    }
+    
+    return disponibilidade, compilar_fixos(posicoes, dias_uteis, dias_semana_no_mes, alocacoes_fixas)
+
+# Ocupante fixo de cada (dia, turno); posicoes vem de mascaras_por_nome
+# O primeiro funcionário encontrado ocupa o turno (por dia da semana, depois por dia específico)
+def compilar_fixos(posicoes, dias_uteis, dias_semana_no_mes, alocacoes_fixas):
+    fixos = {}
+    for funcionario, detalhes in alocacoes_fixas.get('dia_semana', {}).items():
+        if funcionario not in posicoes:
+            continue
+        for bloco in blocos_fixos(detalhes):
+            for dia in dias_uteis:
+                if dias_semana_no_mes[dia] in bloco.get('dias', []):
+                    for turno in ('Matutino', 'Vespertino'):
+                        if turno in bloco.get('turnos', []) and not fixos.get((dia, turno)):
+                            fixos[(dia, turno)] = funcionario
+    
+    for funcionario, detalhes in alocacoes_fixas.get('dias_especificos', {}).items():
+        if funcionario not in posicoes:
+            continue
+        for bloco in blocos_fixos(detalhes):
+            for dia in dias_uteis:
+                if dia in bloco.get('dias', []):
+                    for turno in ('Matutino', 'Vespertino'):
+                        if turno in bloco.get('turnos', []) and not fixos.get((dia, turno)):
+                            fixos[(dia, turno)] = funcionario
+    
+    return fixos
+
+# Fila de prioridade por carga de trabalho, organizada em baldes indexados pelo número de turnos
+# Cada balde guarda a máscara de posições com aquela carga; o desempate é a ordem de entrada
+class FilaDeCarga:
+    # carga: cargas iniciais por funcionário (por padrão, todas zero); posicoes: mascaras_por_nome(funcionarios), se já calculado
+    def __init__(self, funcionarios, carga=None, posicoes=None):
+        self.posicoes = posicoes if posicoes is not None else mascaras_por_nome(funcionarios)
+        self.carga = dict(carga) if carga is not None else {f: 0 for f in funcionarios}
+        # Cada balde é montado de uma vez, empacotando os bits das posições com aquele nível
+        niveis = np.fromiter((self.carga[f] for f in funcionarios), dtype=np.int64, count=len(funcionarios))
+        self.baldes = {
+            int(nivel): int.from_bytes(np.packbits(niveis == nivel, bitorder='little').tobytes(), 'little')
+            for nivel in np.unique(niveis)
+        }
+        self.minimo = min(self.baldes, default=0)
+        self.maximo = max(self.baldes, default=0)
+    
+    # Posição do funcionário menos carregado dentro da máscara (ou -1 se a máscara estiver vazia)
+    def menos_carregado(self, mascara):
+        if not mascara:
+            return -1
+        for nivel in range(self.minimo, self.maximo + 1):
+            candidatos = self.baldes.get(nivel, 0) & mascara
+            if candidatos:
+                return (candidatos & -candidatos).bit_length() - 1
+        return -1
+    
+    # Como menos_carregado, mas com empate desfeito por sorteio entre os funcionários de menor carga
+    def sortear_menos_carregado(self, mascara, sorteio):
+        if not mascara:
+            return -1
+        for nivel in range(self.minimo, self.maximo + 1):
+            candidatos = self.baldes.get(nivel, 0) & mascara
+            if candidatos:
+                return sortear_da_mascara(candidatos, sorteio)
+        return -1
+    
+    # Registrar mais um turno para o funcionário, movendo todas as suas posições de balde
+    def incrementar(self, funcionario):
+        nivel = self.carga[funcionario]
+        mascara = self.posicoes[funcionario]
+        self.carga[funcionario] = nivel + 1
+        
+        restante = self.baldes[nivel] & ~mascara
+        if restante:
+            self.baldes[nivel] = restante
+        else:
+            del self.baldes[nivel]
+        self.baldes[nivel + 1] = self.baldes.get(nivel + 1, 0) | mascara
+        
+        self.maximo = max(self.maximo, nivel + 1)
+        while self.minimo not in self.baldes and self.minimo < self.maximo:
+            self.minimo += 1
+
+# Posição do primeiro funcionário (na ordem de entrada) presente na máscara (ou -1 se vazia)
+def primeiro_da_mascara(mascara):
+    return (mascara & -mascara).bit_length() - 1
+
+# Posição de um funcionário sorteado uniformemente dentre os presentes na máscara (ou -1 se vazia)
+# Busca binária pela posição do k-ésimo bit ligado, contando os bits abaixo de cada ponto de corte
+def sortear_da_mascara(mascara, sorteio):
+    if not mascara:
+        return -1
+    k = sorteio.randrange(mascara.bit_count())
+    baixo, alto = 0, mascara.bit_length() - 1
+    while baixo < alto:
+        meio = (baixo + alto) // 2
+        if (mascara & ((2 << meio) - 1)).bit_count() > k:
+            alto = meio
+        else:
+            baixo = meio + 1
+    return baixo
+
+# Levantada pelo callback de progresso para interromper uma geração em andamento
+class GeracaoCancelada(Exception):
+    pass
+
+# Penalidade, em unidades de custo, por alocar o mesmo funcionário nos dois turnos de um dia
+PENALIDADE_MESMO_DIA = 50
+
+# Fluxo de custo mínimo por caminhos mínimos sucessivos (Dijkstra com potenciais)
+# Os arcos são listas paralelas; o arco reverso de i é i ^ 1. Retorna False se o prazo estourar
+# progresso, se informado, é chamado como progresso(caminhos aumentados, total) a cada iteração
+def fluxo_custo_minimo(adjacencias, destino_arco, capacidade, custo, origem, destino, prazo,
+                       progresso=None, total=0):
+    n = len(adjacencias)
+    potencial = [0] * n
+    infinito = float('inf')
+    aumentados = 0
+    
+    while True:
+        if time.perf_counter() > prazo:
+            return False
+        if progresso:
+            progresso(aumentados, total)
+        
+        distancia = [infinito] * n
+        anterior = [-1] * n
+        finalizado = [False] * n
+        visitados = []
+        distancia[origem] = 0
+        heap = [(0, origem)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if finalizado[u]:
+                continue
+            finalizado[u] = True
+            visitados.append(u)
+            if u == destino:
+                break
+            pu = potencial[u]
+            for arco in adjacencias[u]:
+                if capacidade[arco] <= 0:
+                    continue
+                v = destino_arco[arco]
+                nd = d + custo[arco] + pu - potencial[v]
+                if nd < distancia[v]:
+                    distancia[v] = nd
+                    anterior[v] = arco
+                    heapq.heappush(heap, (nd, v))
+        
+        if not finalizado[destino]:
+            return True
+        
+        # Nós não finalizados recebem a distância do destino, mantendo os custos reduzidos não negativos.
+        # Como só as diferenças de potencial importam, basta ajustar os nós finalizados por (distância - limite)
+        limite = distancia[destino]
+        for v in visitados:
+            potencial[v] += distancia[v] - limite
+        
+        # Todas as capacidades a partir da origem são unitárias: aumentar uma unidade
+        v = destino
+        while v != origem:
+            arco = anterior[v]
+            capacidade[arco] -= 1
+            capacidade[arco ^ 1] += 1
+            v = destino_arco[arco ^ 1]
+        aumentados += 1
+
+# Alocação ótima: maximiza os turnos preenchidos e, entre essas, minimiza a soma dos quadrados das cargas
+# mais a penalidade por turnos duplos no mesmo dia. Retorna None se o tempo limite for atingido
+def alocar_otimo(funcionarios, dias_uteis, disponibilidade, fixos, tempo_limite, penalidade=PENALIDADE_MESMO_DIA,
+                 progresso=None):
+    prazo = time.perf_counter() + tempo_limite
+    posicoes = mascaras_por_nome(funcionarios)
+    nomes = list(posicoes)
+    # Nomes repetidos compartilham as mesmas exceções: basta a primeira posição de cada nome
+    primeira_posicao = {(mascara & -mascara).bit_length() - 1: f for f, mascara in posicoes.items()}
+    
+    carga = {f: 0 for f in nomes}
+    fixos_no_dia = {}
+    for (dia, turno), funcionario in fixos.items():
+        if funcionario:
+            carga[funcionario] += 1
+            fixos_no_dia[(funcionario, dia)] = fixos_no_dia.get((funcionario, dia), 0) + 1
+    
+    turnos_livres = [(dia, turno) for dia in dias_uteis for turno in ('Matutino', 'Vespertino') if not fixos.get((dia, turno))]
+    
+    adjacencias = []
+    destino_arco = []
+    capacidade = []
+    custo = []
+    
+    def novo_no():
+        adjacencias.append([])
+        return len(adjacencias) - 1
+    
+    def novo_arco(u, v, cap, c):
+        adjacencias[u].append(len(destino_arco))
+        destino_arco.append(v)
+        capacidade.append(cap)
+        custo.append(c)
+        adjacencias[v].append(len(destino_arco))
+        destino_arco.append(u)
+        capacidade.append(0)
+        custo.append(-c)
+    
+    origem = novo_no()
+    destino = novo_no()
+    no_funcionario = {f: novo_no() for f in nomes}
+    no_funcionario_dia = {}
+    arcos_turno = []
+    grau = {f: 0 for f in nomes}
+    
+    for (dia, turno) in turnos_livres:
+        no_turno = novo_no()
+        novo_arco(origem, no_turno, 1, 0)
+        candidatos = []
+        mascara = disponibilidade[(dia, turno)]
+        while mascara:
+            bit = mascara & -mascara
+            mascara ^= bit
+            funcionario = primeira_posicao.get(bit.bit_length() - 1)
+            if funcionario is None:
+                continue
+            chave = (funcionario, dia)
+            if chave not in no_funcionario_dia:
+                # O segundo turno do dia (contando alocações fixas) paga a penalidade
+                no_funcionario_dia[chave] = novo_no()
+                if not fixos_no_dia.get(chave):
+                    novo_arco(no_funcionario_dia[chave], no_funcionario[funcionario], 1, 0)
+                novo_arco(no_funcionario_dia[chave], no_funcionario[funcionario], 1, penalidade)
+            candidatos.append((len(destino_arco), funcionario))
+            novo_arco(no_turno, no_funcionario_dia[chave], 1, 0)
+            grau[funcionario] += 1
+        arcos_turno.append(candidatos)
+    
+    # Custo convexo: o k-ésimo turno de quem já tem b turnos custa (b + k)² - (b + k - 1)²
+    for funcionario in nomes:
+        base = carga[funcionario]
+        for k in range(1, grau[funcionario] + 1):
+            novo_arco(no_funcionario[funcionario], destino, 1, 2 * (base + k) - 1)
+    
+    if not fluxo_custo_minimo(adjacencias, destino_arco, capacidade, custo, origem, destino, prazo,
+                              progresso, len(turnos_livres)):
+        return None
+    
+    alocacao = dict(fixos)
+    for (dia, turno), candidatos in zip(turnos_livres, arcos_turno):
+        alocacao[(dia, turno)] = None
+        for arco, funcionario in candidatos:
+            if capacidade[arco] == 0:
+                alocacao[(dia, turno)] = funcionario
+                carga[funcionario] += 1
+                break
+    
+    # O custo considera todos os turnos, mas a carga informada segue a contagem do modo guloso:
+    # alocações fixas no turno vespertino não entram nela
+    for (dia, turno), funcionario in fixos.items():
+        if funcionario and turno == 'Vespertino':
+            carga[funcionario] -= 1
+    
+    return alocacao, carga
+
+# Alocar os dois turnos de um dia útil, atualizando a fila de carga
+def alocar_dia(dia, funcionarios, disponibilidade, fixos, fila, escolher):
+    # Alocações fixas têm prioridade sobre as exceções
+    turno_matutino = fixos.get((dia, 'Matutino'))
+    turno_vespertino = fixos.get((dia, 'Vespertino'))
+    
+    # Funcionários disponíveis para cada turno (sem exceções e sem alocação fixa no turno)
+    disponiveis_matutino = 0 if turno_matutino else disponibilidade[(dia, 'Matutino')]
+    disponiveis_vespertino = 0 if turno_vespertino else disponibilidade[(dia, 'Vespertino')]
+    
+    # Alocar funcionários aos turnos que ainda não foram alocados fixamente
+    # Ambos os turnos são escolhidos com a carga de trabalho do início do dia
+    if not turno_matutino and disponiveis_matutino:
+        turno_matutino = funcionarios[escolher(disponiveis_matutino)]
+    
+    # Tentar não alocar o mesmo funcionário para os dois turnos do mesmo dia
+    if turno_matutino and not turno_vespertino:
+        repetido = disponiveis_vespertino & fila.posicoes[turno_matutino]
+        if repetido and disponiveis_vespertino & (disponiveis_vespertino - 1):
+            disponiveis_vespertino &= ~(repetido & -repetido)
+    
+    vespertino_alocado = False
+    if not turno_vespertino and disponiveis_vespertino:
+        turno_vespertino = funcionarios[escolher(disponiveis_vespertino)]
+        vespertino_alocado = True
+    
+    # Atualizar carga (alocações fixas no turno vespertino não entram na contagem)
+    if turno_matutino:
+        fila.incrementar(turno_matutino)
+    if vespertino_alocado:
+        fila.incrementar(turno_vespertino)
+    
+    return turno_matutino, turno_vespertino
+
+# Alocação gulosa, dia a dia, dando cada turno ao funcionário disponível com menor carga
+# progresso, se informado, é chamado como progresso(dias concluídos, total de dias) antes de cada dia
+# Com sorteio (random.Random), os empates são desfeitos por sorteio em vez da ordem de entrada
+def alocar_guloso(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga=True, progresso=None,
+                  sorteio=None):
+    # Fila de prioridade que controla a carga de trabalho de cada funcionário
+    fila = FilaDeCarga(funcionarios)
+    if sorteio is None:
+        escolher = fila.menos_carregado if considerar_carga else primeiro_da_mascara
+    elif considerar_carga:
+        escolher = lambda mascara: fila.sortear_menos_carregado(mascara, sorteio)
+    else:
+        escolher = lambda mascara: sortear_da_mascara(mascara, sorteio)
+    alocacao = {}
+    
+    # Para cada dia útil, alocar funcionários aos turnos
+    for i, dia in enumerate(dias_uteis):
+        if progresso:
+            progresso(i, len(dias_uteis))
+        alocacao[(dia, 'Matutino')], alocacao[(dia, 'Vespertino')] = alocar_dia(
+            dia, funcionarios, disponibilidade, fixos, fila, escolher
+        )
+    
+    return alocacao, fila.carga
+
+# Número padrão de escalas candidatas do método "candidatos"
+CANDIDATOS_PADRAO = 1000
+
+# Gerador pseudoaleatório do candidato i; a semente em texto dá a mesma sequência em qualquer processo
+def sorteio_do_candidato(semente, i):
+    return random.Random(f"{semente}:{i}")
+
+# Gerar, pelo método guloso com desempate sorteado, os candidatos de índices em `indices`
+# Retorna um array int (candidatos, 2, dias): códigos dos funcionários (posição do nome, -1 se vago)
+# no turno matutino ([:, 0]) e vespertino ([:, 1]) de cada dia útil
+def alocar_candidatos(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga, semente, indices):
+    codigo = {nome: i for i, nome in enumerate(mascaras_por_nome(funcionarios))}
+    candidatos = np.full((len(indices), 2, len(dias_uteis)), -1, dtype=np.int32)
+    for linha, i in enumerate(indices):
+        alocacao, _ = alocar_guloso(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga,
+                                    sorteio=sorteio_do_candidato(semente, i))
+        for coluna, dia in enumerate(dias_uteis):
+            candidatos[linha, 0, coluna] = codigo.get(alocacao[(dia, 'Matutino')], -1)
+            candidatos[linha, 1, coluna] = codigo.get(alocacao[(dia, 'Vespertino')], -1)
+    return candidatos
+
+# Pontuar todos os candidatos de uma vez. Retorna arrays com, por candidato, os turnos vagos,
+# os turnos duplos no mesmo dia, a variância da carga entre os funcionários e o custo
+# (soma dos quadrados das cargas mais a penalidade por turno duplo, como no método ótimo)
+def pontuar_candidatos(candidatos, quantidade_nomes, penalidade=PENALIDADE_MESMO_DIA):
+    quantidade = len(candidatos)
+    matutino, vespertino = candidatos[:, 0], candidatos[:, 1]
+    preenchidos = candidatos >= 0
+    
+    vagos = (~preenchidos).sum(axis=(1, 2))
+    duplos = ((matutino == vespertino) & (matutino >= 0)).sum(axis=1)
+    
+    # Carga por (candidato, funcionário) com um único bincount sobre índices deslocados por candidato
+    linhas = np.broadcast_to(np.arange(quantidade)[:, None, None], candidatos.shape)
+    carga = np.bincount(
+        (linhas[preenchidos] * quantidade_nomes + candidatos[preenchidos]).astype(np.int64),
+        minlength=quantidade * quantidade_nomes
+    ).reshape(quantidade, quantidade_nomes)
+    
+    variancia = carga.var(axis=1) if quantidade_nomes else np.zeros(quantidade)
+    custo = (carga.astype(np.int64) ** 2).sum(axis=1) + penalidade * duplos
+    return vagos, duplos, variancia, custo
+
+# Melhor candidato: menos turnos vagos e, entre esses, menor custo; empates ficam com o menor índice
+def melhor_candidato(vagos, custo):
+    return int(np.lexsort((custo, vagos))[0])
+
+# Alocação por vários candidatos: gera `candidatos` escalas gulosas com desempate sorteado (reprodutíveis
+# pela semente) e fica com a melhor. Os blocos de candidatos são distribuídos em executor_processos
+# (um ProcessPoolExecutor do chamador, reaproveitado entre chamadas); sem ele, tudo roda no próprio processo.
+# progresso é chamado como progresso(candidatos gerados, total). Retorna (alocacao, carga, pontuacao)
+def alocar_por_candidatos(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga=True,
+                          candidatos=CANDIDATOS_PADRAO, semente=0, executor_processos=None, progresso=None):
+    candidatos = max(1, int(candidatos))
+    argumentos = (funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga, semente)
+    
+    # Blocos pequenos o bastante para o progresso avançar e para equilibrar os processos
+    tamanho_bloco = max(1, min(100, -(-candidatos // ((os.cpu_count() or 1) * 4))))
+    blocos = [range(inicio, min(inicio + tamanho_bloco, candidatos)) for inicio in range(0, candidatos, tamanho_bloco)]
+    
+    partes = [None] * len(blocos)
+    if progresso:
+        progresso(0, candidatos)
+    if executor_processos is None:
+        concluidos = 0
+        for n, bloco in enumerate(blocos):
+            partes[n] = alocar_candidatos(*argumentos, bloco)
+            concluidos += len(bloco)
+            if progresso:
+                progresso(concluidos, candidatos)
+    else:
+        futuros = {executor_processos.submit(alocar_candidatos, *argumentos, bloco): n for n, bloco in enumerate(blocos)}
+        try:
+            concluidos = 0
+            for futuro in as_completed(futuros):
+                n = futuros[futuro]
+                partes[n] = futuro.result()
+                concluidos += len(blocos[n])
+                if progresso:
+                    progresso(concluidos, candidatos)
+        finally:
+            # Se a geração for cancelada, os blocos ainda na fila deixam o executor livre para outras gerações
+            for futuro in futuros:
+                futuro.cancel()
+    
+    matriz = np.concatenate(partes)
+    vagos, duplos, variancia, custo = pontuar_candidatos(matriz, len(mascaras_por_nome(funcionarios)))
+    melhor = melhor_candidato(vagos, custo)
+    
+    # Refazer o vencedor (determinístico pela semente) para obter a alocação e a carga no formato do guloso
+    alocacao, carga = alocar_guloso(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga,
+                                    sorteio=sorteio_do_candidato(semente, melhor))
+    pontuacao = {
+        'candidato': melhor,
+        'turnos_vagos': int(vagos[melhor]),
+        'turnos_duplos': int(duplos[melhor]),
+        'variancia_carga': float(variancia[melhor]),
+    }
+    return alocacao, carga, pontuacao
+
+# Dias úteis do mês e o dia da semana de cada dia
+def dias_do_mes(mes, ano):
+    dias_uteis = []
+    dias_semana_no_mes = {}  # Mapear dias do mês para dias da semana
+    
+    for dia in range(1, calendar.monthrange(ano, mes)[1] + 1):
+        data = date(ano, mes, dia)
+        dia_semana = data.weekday()
+        dias_semana_no_mes[dia] = dia_semana
+        if dia_semana < 5:  # Segunda (0) a Sexta (4)
+            dias_uteis.append(dia)
+    
+    return dias_uteis, dias_semana_no_mes
+
+# Escala em formato colunar: arrays tipados em vez de uma lista de dicionários com textos formatados
+# Os funcionários são códigos (posições em nomes, -1 para turno vago); as colunas legíveis
+# ("Data", "Dia da Semana", nomes) só são produzidas sob demanda, para exibição e exportação
+class EscalaColunar:
+    # Verdadeiro quando o método ótimo esgotou o tempo limite e a escala veio do método guloso
+    # (atributo de classe: escalas gravadas antes dele existir continuam legíveis)
+    prazo_esgotado = False
+    
+    def __init__(self, mes, ano, dias, dias_semana, matutino, vespertino, nomes, carga):
+        self.mes = mes
+        self.ano = ano
+        self.dias = dias                # int8: dia do mês de cada dia útil
+        self.dias_semana = dias_semana  # int8: 0 = Segunda ... 4 = Sexta
+        self.matutino = matutino        # int16 (ou int32): código do funcionário, -1 se vago
+        self.vespertino = vespertino
+        self.nomes = nomes              # pd.Index com os nomes, na ordem de entrada
+        self.carga = carga              # int64: total de turnos por nome
+    
+    # Montar a partir da alocação por (dia, turno) e da carga de trabalho por funcionário
+    @classmethod
+    def de_alocacao(cls, mes, ano, dias_uteis, dias_semana_no_mes, alocacao, carga_trabalho):
+        nomes = pd.Index(list(carga_trabalho), dtype=object)
+        codigo = {nome: i for i, nome in enumerate(nomes)}
+        tipo = np.int16 if len(nomes) < np.iinfo(np.int16).max else np.int32
+        n = len(dias_uteis)
+        return cls(
+            mes, ano,
+            np.array(dias_uteis, dtype=np.int8),
+            np.fromiter((dias_semana_no_mes[dia] for dia in dias_uteis), dtype=np.int8, count=n),
+            np.fromiter((codigo.get(alocacao[(dia, 'Matutino')], -1) for dia in dias_uteis), dtype=tipo, count=n),
+            np.fromiter((codigo.get(alocacao[(dia, 'Vespertino')], -1) for dia in dias_uteis), dtype=tipo, count=n),
+            nomes,
+            np.fromiter(carga_trabalho.values(), dtype=np.int64, count=len(nomes)),
+        )
+    
+    def __len__(self):
+        return len(self.dias)
+    
+    # DataFrame legível, no formato exibido na interface e exportado em CSV
+    def tabela(self):
+        nomes = self.nomes.to_numpy()
+        
+        def coluna_nomes(codigos):
+            valores = np.full(len(codigos), None, dtype=object)
+            preenchidos = codigos >= 0
+            valores[preenchidos] = nomes[codigos[preenchidos]]
+            return valores
+        
+        return pd.DataFrame({
+            "Data": pd.Series(self.dias).astype(str).str.zfill(2) + f"/{self.mes:02d}/{self.ano}",
+            "Dia da Semana": np.array(calendar.day_name, dtype=object)[self.dias_semana],
+            "Turno Matutino": coluna_nomes(self.matutino),
+            "Turno Vespertino": coluna_nomes(self.vespertino)
+        })
+    
+    # Estatísticas de carga de trabalho
+    def estatisticas(self):
+        return pd.DataFrame({
+            "Funcionário": list(self.nomes),
+            "Total de Turnos": self.carga
+        })
+
+# Versão de gerar_escala que devolve a escala em formato colunar (EscalaColunar)
+# medidor (diagnostico.Medidor) registra o tempo das fases "disponibilidade", "alocacao" e "montagem"
+# progresso(concluidos, total) acompanha a alocação; para cancelar, ele deve levantar GeracaoCancelada
+# candidatos, semente e executor_processos só valem para o método "candidatos" (ver alocar_por_candidatos)
+def gerar_escala_colunar(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True,
+                         metodo="guloso", tempo_limite=10.0, medidor=MEDIDOR_INATIVO, progresso=None,
+                         candidatos=CANDIDATOS_PADRAO, semente=0, executor_processos=None):
+    dias_uteis, dias_semana_no_mes = dias_do_mes(mes, ano)
+    
+    # Índice de disponibilidade construído uma única vez por chamada
+    with medidor.fase("disponibilidade"):
+        disponibilidade, fixos = compilar_disponibilidade(
+            funcionarios, dias_uteis, dias_semana_no_mes, excecoes, alocacoes_fixas
+        )
+    
+    with medidor.fase("alocacao"):
+        resultado = None
+        if metodo == "otimo":
+            resultado = alocar_otimo(funcionarios, dias_uteis, disponibilidade, fixos, tempo_limite,
+                                     progresso=progresso)
+            medidor.definir("otimo_dentro_do_prazo", resultado is not None)
+        elif metodo == "candidatos":
+            alocacao, carga_trabalho, pontuacao = alocar_por_candidatos(
+                funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga,
+                candidatos=candidatos, semente=semente, executor_processos=executor_processos, progresso=progresso
+            )
+            resultado = (alocacao, carga_trabalho)
+            medidor.definir("candidatos", candidatos)
+            for nome, valor in pontuacao.items():
+                medidor.definir(f"melhor_{nome}", valor)
+        prazo_esgotado = metodo == "otimo" and resultado is None
+        if resultado is None:
+            resultado = alocar_guloso(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga,
+                                      progresso=progresso)
+        alocacao, carga_trabalho = resultado
+    
+    with medidor.fase("montagem"):
+        escala = EscalaColunar.de_alocacao(mes, ano, dias_uteis, dias_semana_no_mes, alocacao, carga_trabalho)
+        escala.prazo_esgotado = prazo_esgotado
+    medidor.definir("dias_calculados", len(dias_uteis))
+    return escala
+
+# Função para gerar a escala considerando exceções e alocações fixas
+# metodo: "guloso" (padrão), "otimo" ou "candidatos"; o método ótimo volta ao guloso se passar de
+# tempo_limite segundos (gerar_escala_colunar indica isso em EscalaColunar.prazo_esgotado); "candidatos" fica com a melhor de `candidatos` escalas com desempate sorteado pela semente
+# Retorna (escala, estatisticas) como DataFrames legíveis
+def gerar_escala(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True,
+                 metodo="guloso", tempo_limite=10.0, candidatos=CANDIDATOS_PADRAO, semente=0):
+    escala = gerar_escala_colunar(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga,
+                                  metodo=metodo, tempo_limite=tempo_limite, candidatos=candidatos, semente=semente)
+    return escala.tabela(), escala.estatisticas()
+
+# Estado de uma escala gulosa, guardado para permitir reparos incrementais
+class EstadoEscala:
+    def __init__(self, mes, ano, funcionarios, considerar_carga, posicoes, excecoes, alocacoes_fixas, disponibilidade,
+                 fixos, alocacao, carga):
+        self.mes = mes
+        self.ano = ano
+        self.funcionarios = list(funcionarios)
+        self.considerar_carga = considerar_carga
+        self.posicoes = posicoes                # mascaras_por_nome(funcionarios), reaproveitado entre edições
+        self.excecoes = excecoes                # Restrições que geraram esta escala, comparadas na próxima edição
+        self.alocacoes_fixas = alocacoes_fixas
+        self.disponibilidade = disponibilidade
+        self.fixos = fixos
+        self.alocacao = alocacao
+        self.carga = carga
+        self.dias_recalculados = 0
+    
+    def compativel(self, mes, ano, funcionarios, considerar_carga):
+        return (self.mes, self.ano, self.funcionarios, self.considerar_carga) == (mes, ano, list(funcionarios), considerar_carga)
+
+# Pares (dia, funcionário) cuja disponibilidade pode ter mudado entre as exceções antigas e as novas
+# Cada categoria é comparada primeiro por inteiro; só as que mudaram são percorridas
+def pares_alterados(antigas, novas, dias_uteis, dias_semana_no_mes):
+    pares = set()
+    uteis = set(dias_uteis)
+    
+    antigos, novos = antigas.get('dias_especificos', {}), novas.get('dias_especificos', {})
+    if antigos != novos:
+        pares.update(antigos.keys() ^ novos.keys())
+    
+    antigos, novos = antigas.get('intervalos', {}), novas.get('intervalos', {})
+    if antigos != novos:
+        for funcionario in antigos.keys() | novos.keys():
+            intervalos_antigos = [tuple(i) for i in antigos.get(funcionario, [])]
+            intervalos_novos = [tuple(i) for i in novos.get(funcionario, [])]
+            if intervalos_antigos != intervalos_novos:
+                pares.update(
+                    (dia, funcionario) for inicio, fim in intervalos_antigos + intervalos_novos
+                    for dia in range(max(inicio, 1), min(fim, 31) + 1)
+                )
+    
+    antigos, novos = antigas.get('dias_semana', {}), novas.get('dias_semana', {})
+    if antigos != novos:
+        for funcionario in antigos.keys() | novos.keys():
+            mudaram = set(antigos.get(funcionario, [])) ^ set(novos.get(funcionario, []))
+            pares.update((dia, funcionario) for dia in dias_uteis if dias_semana_no_mes[dia] in mudaram)
+    
+    antigos, novos = antigas.get('turnos', {}), novas.get('turnos', {})
+    if antigos != novos:
+        for chave in antigos.keys() | novos.keys():
+            mudaram = set(antigos.get(chave, [])) ^ set(novos.get(chave, []))
+            pares.update((chave[0], funcionario) for funcionario in mudaram)
+    
+    return {(dia, funcionario) for dia, funcionario in pares if dia in uteis}
+
+# Igualdade de alocações fixas levando em conta a ordem dos funcionários, que decide quem ocupa o turno
+def mesmas_alocacoes_fixas(antigas, novas):
+    return all(
+        list(antigas.get(categoria, {}).items()) == list(novas.get(categoria, {}).items())
+        for categoria in ('dia_semana', 'dias_especificos')
+    )
+
+# Recalcular, nas máscaras de disponibilidade, os bits de um funcionário num dia, consultando só as suas exceções
+def atualizar_disponibilidade(disponibilidade, posicoes, excecoes, dia, dia_semana, funcionario):
+    mascara = posicoes.get(funcionario, 0)
+    if not mascara:
+        return
+    folga = (
+        (dia, funcionario) in excecoes.get('dias_especificos', {})
+        or any(intervalo[0] <= dia <= intervalo[1] for intervalo in excecoes.get('intervalos', {}).get(funcionario, []))
+        or dia_semana in excecoes.get('dias_semana', {}).get(funcionario, [])
+    )
+    for turno in ('Matutino', 'Vespertino'):
+        if folga or funcionario in excecoes.get('turnos', {}).get((dia, turno), []):
+            disponibilidade[(dia, turno)] &= ~mascara
+        else:
+            disponibilidade[(dia, turno)] |= mascara
+
+# Turnos que contam na carga de trabalho num dia já alocado: o matutino sempre, o vespertino se não for fixo
+def turnos_com_carga(alocacao, fixos, dia):
+    matutino = alocacao[(dia, 'Matutino')]
+    vespertino = None if fixos.get((dia, 'Vespertino')) else alocacao[(dia, 'Vespertino')]
+    return [funcionario for funcionario in (matutino, vespertino) if funcionario]
+
+# Versão incremental de gerar_escala (método guloso): compara as restrições novas com as do estado anterior
+# e recalcula só as máscaras de disponibilidade dos pares (dia, funcionário) afetados; a alocação é refeita
+# do primeiro dia alterado em diante, parando assim que a carga de trabalho volta a coincidir com a anterior
+# depois do último dia alterado. O resultado é idêntico ao da geração completa.
+# A carga do início do primeiro dia alterado é recontada a partir da alocação anterior, sem guardar histórico.
+# As estruturas de exceções e alocações fixas ficam referenciadas no estado: não devem ser alteradas depois
+# Retorna (escala, estado), com a escala em formato colunar; estado deve ser passado como anterior na próxima chamada
+# medidor e progresso funcionam como em gerar_escala_colunar; o total de progresso é o de dias a recalcular
+def gerar_escala_incremental(anterior, mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga=True,
+                             medidor=MEDIDOR_INATIVO, progresso=None):
+    dias_uteis, dias_semana_no_mes = dias_do_mes(mes, ano)
+    
+    if anterior is None or not anterior.compativel(mes, ano, funcionarios, considerar_carga):
+        with medidor.fase("disponibilidade"):
+            disponibilidade, fixos = compilar_disponibilidade(
+                funcionarios, dias_uteis, dias_semana_no_mes, excecoes, alocacoes_fixas
+            )
+        with medidor.fase("alocacao"):
+            alocacao, carga = alocar_guloso(funcionarios, dias_uteis, disponibilidade, fixos, considerar_carga,
+                                            progresso)
+        estado = EstadoEscala(mes, ano, funcionarios, considerar_carga, mascaras_por_nome(funcionarios), excecoes,
+                              alocacoes_fixas, disponibilidade, fixos, alocacao, carga)
+        estado.dias_recalculados = len(dias_uteis)
+        medidor.definir("dias_calculados", estado.dias_recalculados)
+        with medidor.fase("montagem"):
+            escala = EscalaColunar.de_alocacao(mes, ano, dias_uteis, dias_semana_no_mes, alocacao, carga)
+        return escala, estado
+    
+    with medidor.fase("disponibilidade"):
+        posicoes = anterior.posicoes
+        disponibilidade = anterior.disponibilidade
+        pares = pares_alterados(anterior.excecoes, excecoes, dias_uteis, dias_semana_no_mes)
+        if pares:
+            disponibilidade = dict(disponibilidade)
+            for dia, funcionario in pares:
+                atualizar_disponibilidade(disponibilidade, posicoes, excecoes, dia, dias_semana_no_mes[dia], funcionario)
+        fixos = anterior.fixos
+        if not mesmas_alocacoes_fixas(alocacoes_fixas, anterior.alocacoes_fixas):
+            fixos = compilar_fixos(posicoes, dias_uteis, dias_semana_no_mes, alocacoes_fixas)
+        
+        # Dias úteis (por posição) cujas máscaras ou ocupantes fixos mudaram
+        candidatos = {dia for dia, _ in pares}
+        if fixos is not anterior.fixos:
+            candidatos.update(dia for dia, _ in fixos.keys() | anterior.fixos.keys())
+        alterados = [
+            i for i, dia in enumerate(dias_uteis)
+            if dia in candidatos and any(
+                disponibilidade[(dia, turno)] != anterior.disponibilidade[(dia, turno)]
+                or fixos.get((dia, turno)) != anterior.fixos.get((dia, turno))
+                for turno in ('Matutino', 'Vespertino')
+            )
+        ]
+    
+    medidor.iniciar("alocacao")
+    alocacao = anterior.alocacao
+    carga = anterior.carga
+    recalculados = 0
+    
+    if alterados:
+        alocacao = dict(alocacao)
+        # Carga no início do primeiro dia alterado, recontada a partir dos dias anteriores (que não mudam)
+        carga_inicial = dict.fromkeys(funcionarios, 0)
+        for dia in dias_uteis[:alterados[0]]:
+            for funcionario in turnos_com_carga(alocacao, fixos, dia):
+                carga_inicial[funcionario] += 1
+        fila = FilaDeCarga(funcionarios, carga_inicial, posicoes)
+        escolher = fila.menos_carregado if considerar_carga else primeiro_da_mascara
+        carga = fila.carga
+        # Diferença entre a carga nova e a anterior, no início de cada dia (só as entradas não nulas)
+        diferenca = {}
+        
+        for i in range(alterados[0], len(dias_uteis)):
+            # Mesmas restrições e mesma carga de partida: daqui em diante nada muda
+            if i > alterados[-1] and not diferenca:
+                carga = anterior.carga
+                break
+            if progresso:
+                progresso(i - alterados[0], len(dias_uteis) - alterados[0])
+            dia = dias_uteis[i]
+            for funcionario in turnos_com_carga(anterior.alocacao, anterior.fixos, dia):
+                diferenca[funcionario] = diferenca.get(funcionario, 0) - 1
+            alocacao[(dia, 'Matutino')], alocacao[(dia, 'Vespertino')] = alocar_dia(
+                dia, funcionarios, disponibilidade, fixos, fila, escolher
+            )
+            for funcionario in turnos_com_carga(alocacao, fixos, dia):
+                diferenca[funcionario] = diferenca.get(funcionario, 0) + 1
+            diferenca = {funcionario: valor for funcionario, valor in diferenca.items() if valor}
+            recalculados += 1
+    
+    medidor.encerrar("alocacao")
+    estado = EstadoEscala(mes, ano, funcionarios, considerar_carga, posicoes, excecoes, alocacoes_fixas,
+                          disponibilidade, fixos, alocacao, carga)
+    estado.dias_recalculados = recalculados
+    medidor.definir("dias_calculados", recalculados)
+    with medidor.fase("montagem"):
+        escala = EscalaColunar.de_alocacao(mes, ano, dias_uteis, dias_semana_no_mes, alocacao, carga)
+    return escala, estado
+
+# Estruturas vazias de exceções e alocações fixas, no formato usado por gerar_escala
+def excecoes_vazias():
+    return {
+        'dias_especificos': {},  # Exceções para dias específicos
+        'intervalos': {},        # Exceções para intervalos de dias
+        'dias_semana': {},       # Exceções para dias da semana
+        'turnos': {}             # Exceções para turnos específicos
+    }
+
+def alocacoes_fixas_vazias():
+    return {
+        'dia_semana': {},       # Alocações fixas por dia da semana
+        'dias_especificos': {}  # Alocações fixas para dias específicos
+    }
+
+# Tabela de restrições: uma linha por restrição, com as colunas abaixo
+# tipo: folga_dia, folga_intervalo, folga_dia_semana, folga_turno, fixo_dia_semana ou fixo_dia
+# dia: dia do mês (ou dia da semana, 0 = Segunda ... 4 = Sexta, aceitando também os nomes); dia_fim: fim do intervalo
+# turno: Matutino ou Vespertino (folga_turno e alocações fixas); linhas com tipo vazio apenas declaram o funcionário
+COLUNAS_RESTRICOES = ['funcionario', 'tipo', 'dia', 'dia_fim', 'turno']
+TIPOS_RESTRICAO = ['folga_dia', 'folga_intervalo', 'folga_dia_semana', 'folga_turno', 'fixo_dia_semana', 'fixo_dia']
+NOMES_DIAS_SEMANA = {'segunda': 0, 'terça': 1, 'terca': 1, 'quarta': 2, 'quinta': 3, 'sexta': 4}
+# Tipos cujo dia é um dia da semana (0 a 4, aceitando os nomes); nos demais, é um dia do mês (1 a 31)
+TIPOS_DIA_SEMANA = ['folga_dia_semana', 'fixo_dia_semana']
+
+# Ler uma tabela de restrições de um arquivo CSV ou XLSX (caminho ou arquivo enviado pela interface)
+def ler_tabela_restricoes(arquivo, nome_arquivo=None):
+    nome = str(nome_arquivo or getattr(arquivo, 'name', arquivo)).lower()
+    if nome.endswith(('.xlsx', '.xlsm')):
+        tabela = pd.read_excel(arquivo, dtype=object)
+    elif nome.endswith('.csv'):
+        tabela = pd.read_csv(arquivo, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError(f"Formato de arquivo não suportado: {nome}")
+    return normalizar_restricoes(tabela)
+
+# Padronizar e validar uma tabela de restrições (operações vetorizadas, sem laço por linha)
+def normalizar_restricoes(tabela):
+    tabela = tabela.rename(columns=lambda coluna: str(coluna).strip().lower())
+    if 'funcionario' not in tabela.columns:
+        raise ValueError("A tabela de restrições precisa da coluna 'funcionario'")
+    tabela = tabela.reindex(columns=COLUNAS_RESTRICOES)
+    
+    texto = {coluna: tabela[coluna].astype('string').str.strip().replace('', pd.NA) for coluna in COLUNAS_RESTRICOES}
+    tipo = texto['tipo'].str.lower()
+    dia_texto = texto['dia'].str.lower()
+    # Dias como float (NaN quando vazios ou ilegíveis); os nomes dos dias da semana só valem nos tipos semanais
+    nomeado = pd.to_numeric(dia_texto.map(NOMES_DIAS_SEMANA)).where(tipo.isin(TIPOS_DIA_SEMANA))
+    dia = pd.to_numeric(dia_texto, errors='coerce').astype('float64').fillna(nomeado.astype('float64'))
+    dia_fim = pd.to_numeric(texto['dia_fim'], errors='coerce').astype('float64')
+    resultado = pd.DataFrame({
+        'funcionario': texto['funcionario'],
+        'tipo': tipo,
+        'dia': dia,
+        'dia_fim': dia_fim,
+        'turno': texto['turno'].str.capitalize(),
+        'dia_informado': texto['dia'].notna(),
+    })
+    resultado = resultado[resultado['funcionario'].notna()]
+    
+    tipo, dia, dia_fim = resultado['tipo'], resultado['dia'], resultado['dia_fim']
+    dia_inteiro = np.isfinite(dia) & (dia % 1 == 0)
+    fim_inteiro = np.isfinite(dia_fim) & (dia_fim % 1 == 0)
+    semanal = tipo.isin(TIPOS_DIA_SEMANA)
+    do_mes = tipo.isin(TIPOS_RESTRICAO) & ~semanal
+    intervalo = tipo == 'folga_intervalo'
+    problemas = {
+        'tipo desconhecido': tipo.notna() & ~tipo.isin(TIPOS_RESTRICAO),
+        'dia ausente': tipo.notna() & ~resultado['dia_informado'],
+        'dia inválido': tipo.notna() & resultado['dia_informado'] & ~dia_inteiro,
+        'dia do mês fora de 1 a 31': do_mes & dia_inteiro & ~dia.between(1, 31),
+        'dia da semana fora de 0 (Segunda) a 4 (Sexta)': semanal & dia_inteiro & ~dia.between(0, 4),
+        'fim do intervalo ausente': intervalo & dia_fim.isna(),
+        'fim do intervalo inválido': intervalo & dia_fim.notna() & (~fim_inteiro | ~dia_fim.between(1, 31)),
+        'fim do intervalo antes do início': intervalo & dia_inteiro & fim_inteiro & (dia_fim < dia),
+        'turno inválido': tipo.isin(['folga_turno', 'fixo_dia_semana', 'fixo_dia'])
+                          & ~resultado['turno'].isin(['Matutino', 'Vespertino']),
+    }
+    # Linhas numeradas a partir de 1, sem contar o cabeçalho
+    erros = [
+        f"{descricao} (linhas {', '.join(str(i + 1) for i in mascara[mascara.fillna(False)].index[:10])})"
+        for descricao, mascara in problemas.items()
+        if mascara.fillna(False).any()
+    ]
+    if erros:
+        raise ValueError("Restrições inválidas: " + "; ".join(erros))
+    
+    # Dias fora das linhas com tipo (que só declaram o funcionário) são descartados
+    inteiros = {'dia': dia.where(dia_inteiro), 'dia_fim': dia_fim.where(fim_inteiro)}
+    resultado = resultado.drop(columns='dia_informado').assign(
+        **{coluna: valores.astype('Int64') for coluna, valores in inteiros.items()}
+    )
+    return resultado.reset_index(drop=True)
+
+# Converter uma tabela normalizada nas estruturas de exceções e alocações fixas usadas por gerar_escala
+# Nas alocações fixas, cada linha fixa apenas o seu par (dia, turno) (ver alocacao_fixa_de_pares)
+# Retorna (funcionarios, excecoes, alocacoes_fixas), com os funcionários na ordem em que aparecem
+def estruturas_de_restricoes(tabela):
+    excecoes = excecoes_vazias()
+    alocacoes_fixas = alocacoes_fixas_vazias()
+    funcionarios = list(dict.fromkeys(tabela['funcionario'].tolist()))
+    
+    grupos = {tipo: grupo.astype({'dia': 'int64'}) for tipo, grupo in tabela.groupby('tipo', sort=False)}
+    vazio = tabela.iloc[:0].astype({'dia': 'int64'})
+    sem_repeticao = lambda serie: list(dict.fromkeys(serie.tolist()))
+    
+    grupo = grupos.get('folga_dia', vazio)
+    excecoes['dias_especificos'] = dict.fromkeys(zip(grupo['dia'].tolist(), grupo['funcionario'].tolist()), True)
+    
+    grupo = grupos.get('folga_intervalo', vazio)
+    pares = pd.Series(list(zip(grupo['dia'].tolist(), grupo['dia_fim'].astype('int64').tolist())), index=grupo.index, dtype=object)
+    excecoes['intervalos'] = pares.groupby(grupo['funcionario'], sort=False).agg(list).to_dict()
+    
+    grupo = grupos.get('folga_dia_semana', vazio)
+    excecoes['dias_semana'] = grupo.groupby('funcionario', sort=False)['dia'].agg(sem_repeticao).to_dict()
+    
+    grupo = grupos.get('folga_turno', vazio)
+    excecoes['turnos'] = {
+        (int(dia), turno): nomes
+        for (dia, turno), nomes in grupo.groupby(['dia', 'turno'], sort=False)['funcionario'].agg(list).items()
+    }
+    
+    for tipo, categoria in (('fixo_dia_semana', 'dia_semana'), ('fixo_dia', 'dias_especificos')):
+        grupo = grupos.get(tipo, vazio)
+        alocacoes_fixas[categoria] = {
+            funcionario: alocacao_fixa_de_pares(linhas['dia'].tolist(), linhas['turno'].tolist())
+            for funcionario, linhas in grupo.groupby('funcionario', sort=False)
+        }
+    
+    return funcionarios, excecoes, alocacoes_fixas
+
+# Restrições de excecoes e alocacoes_fixas como tuplas (funcionario, tipo, dia, dia_fim, turno), na ordem de
+# COLUNAS_RESTRICOES; cada bloco de alocação fixa vira o produto dos seus dias e turnos, na ordem original
+def linhas_de_restricoes(excecoes, alocacoes_fixas):
+    linhas = [(funcionario, 'folga_dia', dia, None, None)
+              for (dia, funcionario) in excecoes.get('dias_especificos', {})]
+    linhas += [(funcionario, 'folga_intervalo', intervalo[0], intervalo[1], None)
+               for funcionario, intervalos in excecoes.get('intervalos', {}).items() for intervalo in intervalos]
+    linhas += [(funcionario, 'folga_dia_semana', dia, None, None)
+               for funcionario, dias in excecoes.get('dias_semana', {}).items() for dia in dias]
+    linhas += [(funcionario, 'folga_turno', dia, None, turno)
+               for (dia, turno), nomes in excecoes.get('turnos', {}).items() for funcionario in nomes]
+    for tipo, categoria in (('fixo_dia_semana', 'dia_semana'), ('fixo_dia', 'dias_especificos')):
+        linhas += [(funcionario, tipo, dia, None, turno)
+                   for funcionario, detalhes in alocacoes_fixas.get(categoria, {}).items()
+                   for bloco in blocos_fixos(detalhes)
+                   for dia in bloco.get('dias', []) for turno in bloco.get('turnos', [])]
+    return linhas
+
+# Carregar a configuração de uma equipe a partir de um arquivo JSON, CSV ou XLSX
+#
+# JSON: {"nome": ..., "funcionarios": [...], "restricoes": [{"funcionario": ..., "tipo": ..., "dia": ...,
+#        "dia_fim": ..., "turno": ...}], "considerar_carga": true, "metodo": "guloso", "tempo_limite": 10,
+#        "candidatos": 1000, "semente": 0}
+# CSV/XLSX: tabela de restrições (ver COLUNAS_RESTRICOES)
+#
+# Retorna um dicionário com nome, funcionarios, excecoes, alocacoes_fixas e as opções de geração
+def carregar_equipe(caminho):
+    caminho = Path(caminho)
+    if caminho.suffix.lower() == '.json':
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        tabela = normalizar_restricoes(pd.DataFrame(dados.get('restricoes', []), columns=COLUNAS_RESTRICOES))
+        _, excecoes, alocacoes_fixas = estruturas_de_restricoes(tabela)
+        funcionarios = list(dados.get('funcionarios', []))
+    else:
+        dados = {}
+        funcionarios, excecoes, alocacoes_fixas = estruturas_de_restricoes(ler_tabela_restricoes(caminho))
+    
+    return {
+        'nome': dados.get('nome') or caminho.stem,
+        'funcionarios': funcionarios,
+        'excecoes': excecoes,
+        'alocacoes_fixas': alocacoes_fixas,
+        'considerar_carga': dados.get('considerar_carga', True),
+        'metodo': dados.get('metodo', 'guloso'),
+        'tempo_limite': dados.get('tempo_limite', 10.0),
+        'candidatos': dados.get('candidatos', CANDIDATOS_PADRAO),
+        'semente': dados.get('semente', 0)
+    }
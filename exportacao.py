@@ -0,0 +1,187 @@
+# Exportação de escalas em XLSX, Parquet e iCalendar
+# As escalas entram como um iterável de (nome, EscalaColunar), por exemplo uma por mês ou por equipe,
+# e as linhas são geradas e gravadas aos poucos, sem montar DataFrames legíveis em memória
+import calendar
+import hashlib
+import re
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+CABECALHO_ESCALA = ["Data", "Dia da Semana", "Turno Matutino", "Turno Vespertino"]
+
+# Horário de cada turno nos arquivos iCalendar (início, fim)
+HORARIOS_TURNOS = {
+    'Matutino': ("080000", "120000"),
+    'Vespertino': ("130000", "180000"),
+}
+
+# Acima deste tamanho, o arquivo temporário usado para download passa da memória para o disco
+LIMITE_MEMORIA_EXPORTACAO = 8 * 1024 * 1024
+
+# Linhas (Data, Dia da Semana, Turno Matutino, Turno Vespertino) de uma escala, uma por dia útil
+def linhas_escala(escala):
+    nomes = escala.nomes.to_numpy()
+    sufixo = f"/{escala.mes:02d}/{escala.ano}"
+    for dia, dia_semana, matutino, vespertino in zip(
+        escala.dias.tolist(), escala.dias_semana.tolist(), escala.matutino.tolist(), escala.vespertino.tolist()
+    ):
+        yield (
+            f"{dia:02d}{sufixo}",
+            calendar.day_name[dia_semana],
+            nomes[matutino] if matutino >= 0 else None,
+            nomes[vespertino] if vespertino >= 0 else None,
+        )
+
+# Nome de aba válido no Excel (até 31 caracteres, sem []:*?/\) e único na pasta de trabalho
+def nome_aba(nome, usados):
+    base = re.sub(r'[\[\]:*?/\\]', '-', str(nome)).strip("'")[:31] or "Escala"
+    candidato = base
+    contador = 2
+    while candidato.lower() in usados:
+        sufixo = f" ({contador})"
+        candidato = base[:31 - len(sufixo)] + sufixo
+        contador += 1
+    usados.add(candidato.lower())
+    return candidato
+
+# XLSX em modo somente escrita (openpyxl): uma aba por escala e uma aba "Estatísticas" com os totais de todas
+def exportar_xlsx(escalas, destino):
+    from openpyxl import Workbook
+    
+    livro = Workbook(write_only=True)
+    usados = {"estatísticas"}
+    aba_estatisticas = livro.create_sheet("Estatísticas")
+    aba_estatisticas.append(["Escala", "Funcionário", "Total de Turnos"])
+    
+    for nome, escala in escalas:
+        aba = livro.create_sheet(nome_aba(nome, usados))
+        aba.append(CABECALHO_ESCALA)
+        for linha in linhas_escala(escala):
+            aba.append(linha)
+        for funcionario, total in zip(escala.nomes.tolist(), escala.carga.tolist()):
+            aba_estatisticas.append([nome, funcionario, total])
+    
+    livro.save(destino)
+
+# Parquet (pyarrow), um grupo de linhas por escala, com a data como coluna do tipo date
+def exportar_parquet(escalas, destino):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as erro:
+        raise ImportError("A exportação em Parquet requer o pacote pyarrow") from erro
+    
+    esquema = pa.schema([
+        ("escala", pa.string()),
+        ("data", pa.date32()),
+        ("dia_semana", pa.string()),
+        ("turno_matutino", pa.string()),
+        ("turno_vespertino", pa.string()),
+    ])
+    dias_semana = pa.array(list(calendar.day_name))
+    
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for nome, escala in escalas:
+            nomes = pa.array(escala.nomes.tolist(), type=pa.string())
+            
+            def coluna_nomes(codigos):
+                return nomes.take(pa.array(codigos.astype(np.int32), mask=codigos < 0))
+            
+            datas = np.datetime64(f"{escala.ano:04d}-{escala.mes:02d}-01") + (escala.dias.astype(np.int64) - 1)
+            escritor.write_table(pa.table({
+                "escala": pa.array([str(nome)] * len(escala), type=pa.string()),
+                "data": pa.array(datas, type=pa.date32()),
+                "dia_semana": dias_semana.take(pa.array(escala.dias_semana.astype(np.int32))),
+                "turno_matutino": coluna_nomes(escala.matutino),
+                "turno_vespertino": coluna_nomes(escala.vespertino),
+            }, schema=esquema))
+
+# Escapar texto conforme a RFC 5545
+def texto_ics(texto):
+    return str(texto).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+# Linhas de um calendário iCalendar com os turnos de um funcionário
+# eventos: iterável de (nome da escala, data AAAAMMDD, turno)
+def calendario_funcionario(funcionario, eventos):
+    carimbo = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    identificador = hashlib.sha1(str(funcionario).encode("utf-8")).hexdigest()[:12]
+    
+    yield "BEGIN:VCALENDAR"
+    yield "VERSION:2.0"
+    yield "PRODID:-//MPESCALAS//Gerador de Escala de Trabalho//PT"
+    yield f"X-WR-CALNAME:{texto_ics(f'Escala de {funcionario}')}"
+    
+    for nome, data, turno in eventos:
+        inicio, fim = HORARIOS_TURNOS[turno]
+        yield "BEGIN:VEVENT"
+        yield f"UID:{data}-{turno.lower()}-{identificador}@mpescalas"
+        yield f"DTSTAMP:{carimbo}"
+        yield f"DTSTART:{data}T{inicio}"
+        yield f"DTEND:{data}T{fim}"
+        yield f"SUMMARY:{texto_ics(f'Turno {turno}')}"
+        yield f"DESCRIPTION:{texto_ics(nome)}"
+        yield "END:VEVENT"
+    
+    yield "END:VCALENDAR"
+
+# ZIP com um arquivo .ics por funcionário
+# As escalas são percorridas uma única vez: cada turno ocupado vira um evento (funcionário, escala, data, turno)
+# guardado em arrays de inteiros; depois os eventos são ordenados por funcionário e cada calendário é gravado
+# linha a linha, sem manter as escalas em memória
+def exportar_icalendar(escalas, destino):
+    indices = {}          # Funcionário -> número, na ordem em que aparece
+    nomes_escalas = []
+    partes = []
+    for nome, escala in escalas:
+        numeros = np.array([indices.setdefault(f, len(indices)) for f in escala.nomes.tolist()], dtype=np.int32)
+        datas = escala.ano * 10000 + escala.mes * 100 + escala.dias.astype(np.int32)
+        for t, codigos in enumerate((escala.matutino, escala.vespertino)):
+            ocupados = codigos >= 0
+            partes.append((
+                numeros[codigos[ocupados]],
+                np.full(ocupados.sum(), len(nomes_escalas), dtype=np.int32),
+                datas[ocupados],
+                np.full(ocupados.sum(), t, dtype=np.int8),
+            ))
+        nomes_escalas.append(str(nome))
+    
+    if partes:
+        funcionario, escala, data, turno = (np.concatenate(coluna) for coluna in zip(*partes))
+    else:
+        funcionario = escala = data = turno = np.empty(0, dtype=np.int32)
+    # A ordenação estável mantém, para cada funcionário, a ordem das escalas e dos turnos
+    ordem = np.argsort(funcionario, kind="stable")
+    limites = np.searchsorted(funcionario[ordem], np.arange(len(indices) + 1))
+    turnos = list(HORARIOS_TURNOS)
+    usados = set()
+    
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        for i, nome_funcionario in enumerate(indices):
+            fatia = ordem[limites[i]:limites[i + 1]]
+            eventos = zip(
+                [nomes_escalas[e] for e in escala[fatia].tolist()],
+                data[fatia].tolist(),
+                [turnos[t] for t in turno[fatia].tolist()],
+            )
+            with arquivo_zip.open(f"{nome_aba(nome_funcionario, usados)}.ics", "w") as arquivo:
+                for linha in calendario_funcionario(nome_funcionario, eventos):
+                    arquivo.write((linha + "\r\n").encode("utf-8"))
+
+# Formatos disponíveis: rótulo -> (função, extensão, tipo MIME)
+FORMATOS_EXPORTACAO = {
+    "XLSX": (exportar_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": (exportar_parquet, "parquet", "application/vnd.apache.parquet"),
+    "iCalendar (um arquivo por funcionário)": (exportar_icalendar, "zip", "application/zip"),
+}
+
+# Exportar para um arquivo temporário (em memória até LIMITE_MEMORIA_EXPORTACAO, depois em disco),
+# devolvido já posicionado no início, pronto para st.download_button ler em partes
+def exportar_para_arquivo_temporario(formato, escalas):
+    exportar = FORMATOS_EXPORTACAO[formato][0]
+    temporario = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_EXPORTACAO)
+    exportar(escalas, temporario)
+    temporario.seek(0)
+    return temporario
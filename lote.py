@@ -0,0 +1,185 @@
+# Geração de escalas em lote, sem interface
+#
+# Uso: python lote.py equipes/*.json --ano 2026 --meses 1-12 --saida escalas/
+#      python lote.py equipes/*.json --ano 2026 --banco mpescalas.db   # também guarda equipes e escalas no SQLite
+#      python lote.py --ano 2026 --banco mpescalas.db                  # gera todas as equipes salvas no banco
+#
+# Cada par (equipe, mês) é um trabalho independente, distribuído num ProcessPoolExecutor;
+# cada trabalho grava um CSV no mesmo formato do botão "Baixar como CSV", ou, com --formato
+# xlsx, parquet ou ics, todas as escalas vão para um único arquivo (ver exportacao.py).
+# O Streamlit e o Altair nunca são importados, e o núcleo (escala.py) só é carregado quando necessário.
+import argparse
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+
+# Interpretar a lista de meses: "1-12", "3", "1,4,7" ou combinações
+def interpretar_meses(texto):
+    meses = []
+    for parte in texto.split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if '-' in parte:
+            inicio, fim = (int(x) for x in parte.split('-', 1))
+            meses.extend(range(inicio, fim + 1))
+        else:
+            meses.append(int(parte))
+    for mes in meses:
+        if not 1 <= mes <= 12:
+            raise argparse.ArgumentTypeError(f"Mês inválido: {mes}")
+    return sorted(set(meses))
+
+# Nomes de arquivo para as equipes, na mesma ordem: só letras, números, ".", "-" e "_", e sem repetição
+# (equipes com o mesmo nome, ou nomes iguais depois da limpeza, recebem os sufixos -2, -3, ...)
+def nomes_de_arquivo(nomes):
+    usados = set()
+    resultado = []
+    for nome in nomes:
+        base = re.sub(r'[^\w.-]+', '_', str(nome)).strip('._') or 'equipe'
+        candidato = base
+        contador = 2
+        while candidato.lower() in usados:
+            candidato = f"{base}-{contador}"
+            contador += 1
+        usados.add(candidato.lower())
+        resultado.append(candidato)
+    return resultado
+
+# Formatos consolidados: todas as escalas num único arquivo (rótulos de exportacao.FORMATOS_EXPORTACAO)
+FORMATOS_CONSOLIDADOS = {
+    "xlsx": "XLSX",
+    "parquet": "Parquet",
+    "ics": "iCalendar (um arquivo por funcionário)",
+}
+
+# Gerar a escala de um (equipe, mês); executado nos processos do pool
+# Com saida, grava o CSV (escala_<nome_arquivo>_<mês>_<ano>.csv) e devolve o caminho; sem saida, devolve
+# a própria escala (formato colunar). Com banco, a escala também é gravada no banco SQLite (ver armazenamento.py)
+def gerar_trabalho(equipe, mes, ano, saida=None, banco=None, nome_arquivo=None):
+    from escala import gerar_escala_colunar
+    
+    inicio = time.perf_counter()
+    # Sem executor_processos: no método "candidatos", o paralelismo já vem do pool do lote
+    escala = gerar_escala_colunar(
+        mes, ano, equipe['funcionarios'], equipe['excecoes'], equipe['alocacoes_fixas'],
+        equipe['considerar_carga'], metodo=equipe['metodo'], tempo_limite=equipe['tempo_limite'],
+        candidatos=equipe['candidatos'], semente=equipe['semente']
+    )
+    vagos = int((escala.matutino < 0).sum() + (escala.vespertino < 0).sum())
+    if banco is not None:
+        from armazenamento import BancoDeEscalas
+        from cache_escala import chave_configuracao
+        
+        chave = chave_configuracao(
+            mes, ano, equipe['funcionarios'], equipe['excecoes'], equipe['alocacoes_fixas'], equipe['considerar_carga'],
+            equipe['metodo'], equipe['tempo_limite'], equipe['candidatos'], equipe['semente']
+        )
+        conexao = BancoDeEscalas(banco)
+        try:
+            conexao.salvar_escala(equipe['nome'], escala, chave)
+        finally:
+            conexao.fechar()
+    if saida is None:
+        return escala, vagos, time.perf_counter() - inicio
+    
+    arquivo = Path(saida) / f"escala_{nome_arquivo or nomes_de_arquivo([equipe['nome']])[0]}_{mes}_{ano}.csv"
+    escala.tabela().to_csv(arquivo, index=False)
+    return str(arquivo), vagos, time.perf_counter() - inicio
+
+def relatar(nome, mes, ano, destino, vagos, duracao):
+    aviso = f" ({vagos} turnos sem funcionário)" if vagos else ""
+    print(f"{nome} {mes:02d}/{ano} -> {destino} em {duracao:.2f}s{aviso}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera escalas de trabalho em lote para várias equipes e meses.")
+    parser.add_argument("equipes", nargs="*",
+                        help="Arquivos de configuração das equipes (.json, .csv ou .xlsx); "
+                             "sem arquivos, usa as equipes salvas em --banco")
+    parser.add_argument("--ano", type=int, required=True, help="Ano das escalas")
+    parser.add_argument("--meses", type=interpretar_meses, default=list(range(1, 13)),
+                        help="Meses a gerar, ex.: 1-12 ou 1,4,7 (padrão: o ano todo)")
+    parser.add_argument("--saida", default="escalas", help="Diretório de saída (padrão: escalas)")
+    parser.add_argument("--formato", choices=["csv", *FORMATOS_CONSOLIDADOS], default="csv",
+                        help="csv: um arquivo por equipe e mês; xlsx, parquet ou ics: um único arquivo "
+                             "com todas as escalas, gravado à medida que ficam prontas (padrão: csv)")
+    parser.add_argument("--processos", type=int, default=os.cpu_count(),
+                        help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument("--banco", help="Banco SQLite onde guardar as equipes e as escalas geradas")
+    args = parser.parse_args(argv)
+    if not args.equipes and not args.banco:
+        parser.error("informe os arquivos das equipes ou --banco")
+    
+    from escala import carregar_equipe
+    
+    Path(args.saida).mkdir(parents=True, exist_ok=True)
+    equipes = [carregar_equipe(caminho) for caminho in args.equipes]
+    if args.banco:
+        from armazenamento import BancoDeEscalas
+        
+        banco = BancoDeEscalas(args.banco)
+        banco.salvar_equipes(equipes)
+        if not equipes:
+            equipes = [banco.carregar_equipe(nome) for nome in banco.equipes()]
+        banco.fechar()
+    consolidado = args.formato != "csv"
+    
+    inicio = time.perf_counter()
+    falhas = 0
+    with ProcessPoolExecutor(max_workers=args.processos) as executor:
+        futuros = {
+            executor.submit(
+                gerar_trabalho, equipe, mes, args.ano, None if consolidado else args.saida, args.banco, nome_arquivo
+            ): (equipe['nome'], mes)
+            for equipe, nome_arquivo in zip(equipes, nomes_de_arquivo(equipe['nome'] for equipe in equipes))
+            for mes in args.meses
+        }
+        total = len(futuros)
+        
+        # Cada futuro é descartado assim que consumido, liberando a escala que ele guarda
+        if not consolidado:
+            for futuro in as_completed(futuros):
+                nome, mes = futuros.pop(futuro)
+                try:
+                    arquivo, vagos, duracao = futuro.result()
+                except Exception as erro:
+                    falhas += 1
+                    print(f"[erro] {nome} {mes:02d}/{args.ano}: {erro}", file=sys.stderr)
+                    continue
+                relatar(nome, mes, args.ano, arquivo, vagos, duracao)
+        else:
+            from exportacao import FORMATOS_EXPORTACAO
+            
+            exportar, extensao, _ = FORMATOS_EXPORTACAO[FORMATOS_CONSOLIDADOS[args.formato]]
+            arquivo = Path(args.saida) / f"escalas_{args.ano}.{extensao}"
+            
+            # Consome os resultados na ordem dos trabalhos, entregando cada escala ao exportador assim que fica pronta
+            pendentes = deque(futuros.items())
+            futuros.clear()
+            
+            def escalas_prontas():
+                nonlocal falhas
+                while pendentes:
+                    futuro, (nome, mes) = pendentes.popleft()
+                    try:
+                        escala, vagos, duracao = futuro.result()
+                    except Exception as erro:
+                        falhas += 1
+                        print(f"[erro] {nome} {mes:02d}/{args.ano}: {erro}", file=sys.stderr)
+                        continue
+                    relatar(nome, mes, args.ano, arquivo, vagos, duracao)
+                    yield f"{nome} {mes:02d}-{args.ano}", escala
+            
+            exportar(escalas_prontas(), arquivo)
+    
+    print(f"{total - falhas} escalas geradas em {time.perf_counter() - inicio:.2f}s")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# Geração de escalas em segundo plano, com acompanhamento de progresso e cancelamento
+# Um único ExecutorDeEscalas é compartilhado por todas as sessões do servidor; cada geração submetida vira uma Tarefa
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+
+from cache_escala import chave_configuracao
+from diagnostico import MEDIDOR_INATIVO
+from escala import CANDIDATOS_PADRAO, GeracaoCancelada, gerar_escala_incremental
+
+
+class Tarefa:
+    def __init__(self, chave, medidor=MEDIDOR_INATIVO):
+        self.chave = chave          # Chave da configuração (cache_escala.chave_configuracao) sendo gerada
+        self.medidor = medidor
+        self.concluidos = 0
+        self.total = 0
+        self.cancelamento = threading.Event()
+        self.futuro = None
+
+    # Callback passado ao gerador: registra o andamento e interrompe a geração se a tarefa foi cancelada
+    def progresso(self, concluidos, total):
+        if self.cancelamento.is_set():
+            raise GeracaoCancelada()
+        self.concluidos, self.total = concluidos, total
+
+    def fracao(self):
+        return min(self.concluidos / self.total, 1.0) if self.total else 0.0
+
+    def cancelar(self):
+        self.cancelamento.set()
+        self.futuro.cancel()
+
+    def cancelada(self):
+        return self.cancelamento.is_set()
+
+    def concluida(self):
+        return self.futuro.done()
+
+    # Resultado da geração, ou None se ela foi cancelada; erros da geração são repassados
+    def resultado(self):
+        try:
+            return self.futuro.result()
+        except (CancelledError, GeracaoCancelada):
+            return None
+
+# Estados da geração incremental guardados por sessão, um por (mês, ano); acima disso saem os mais antigos
+LIMITE_ESTADOS = 12
+
+# Gerar a escala (formato colunar) consultando o cache; no método guloso, reaproveita o estado do mesmo mês
+# e recalcula apenas os dias afetados pelas restrições alteradas
+# estados: dicionário (mes, ano) -> EstadoEscala (ou None); retorna (escala, estados), com os estados atualizados
+# num novo dicionário. Roda nas threads do executor: não deve depender do st.session_state
+def gerar_com_cache(cache, estados, mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga, metodo,
+                    tempo_limite, medidor=MEDIDOR_INATIVO, progresso=None, candidatos=CANDIDATOS_PADRAO, semente=0,
+                    executor_processos=None):
+    if metodo != "guloso":
+        escala = cache.gerar_colunar(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga,
+                                     metodo, tempo_limite, medidor=medidor, progresso=progresso,
+                                     candidatos=candidatos, semente=semente, executor_processos=executor_processos)
+        return escala, estados
+
+    with medidor.fase("cache"):
+        chave = chave_configuracao(mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga, metodo, tempo_limite)
+        escala = cache.obter(chave)
+    medidor.definir("cache_acerto", escala is not None)
+    if escala is not None:
+        return escala, estados
+
+    estados = dict(estados or {})
+    escala, estado = gerar_escala_incremental(
+        estados.pop((mes, ano), None), mes, ano, funcionarios, excecoes, alocacoes_fixas, considerar_carga,
+        medidor=medidor, progresso=progresso
+    )
+    cache.guardar(chave, escala)
+    # O mês gerado passa a ser o mais recente
+    estados[(mes, ano)] = estado
+    while len(estados) > LIMITE_ESTADOS:
+        del estados[next(iter(estados))]
+    return escala, estados
+
+
+class ExecutorDeEscalas:
+    # trabalhadores: gerações simultâneas (threads); processos: tamanho do pool de processos compartilhado
+    # pelo método "candidatos" (1 gera os candidatos na própria thread)
+    def __init__(self, trabalhadores=None, processos=None):
+        self.executor = ThreadPoolExecutor(
+            max_workers=trabalhadores or min(4, os.cpu_count() or 1),
+            thread_name_prefix="escala"
+        )
+        processos = processos or os.cpu_count() or 1
+        # "spawn": criar processos com fork a partir de um servidor com várias threads pode travar
+        self.processos = ProcessPoolExecutor(
+            max_workers=processos, mp_context=multiprocessing.get_context("spawn")
+        ) if processos > 1 else None
+
+    # Submeter funcao(*args, **kwargs, medidor=..., progresso=...) e devolver a Tarefa correspondente
+    # Com perfilar, a função roda sob cProfile e o relatório fica no medidor da tarefa
+    def submeter(self, chave, funcao, *args, medidor=MEDIDOR_INATIVO, perfilar=False, **kwargs):
+        tarefa = Tarefa(chave, medidor)
+        executar = medidor.perfilar if perfilar else MEDIDOR_INATIVO.perfilar
+        tarefa.futuro = self.executor.submit(
+            executar, funcao, *args, medidor=medidor, progresso=tarefa.progresso, **kwargs
+        )
+        return tarefa
@@ -0,0 +1,226 @@
+# Validação de escalas (geradas ou editadas à mão) contra as exceções e alocações fixas
+# A escala é lida no formato do "Baixar como CSV" (ver exportacao.CABECALHO_ESCALA) e pode cobrir vários meses;
+# todas as verificações são junções e máscaras do pandas, sem laço por linha da escala
+#
+# Uso pela linha de comando:
+#   python validacao.py equipe.json escala_3_2026.csv [escala_4_2026.csv ...]
+# Termina com código 1 se alguma violação for encontrada
+import argparse
+import sys
+
+import pandas as pd
+
+from escala import COLUNAS_RESTRICOES, linhas_de_restricoes
+from exportacao import CABECALHO_ESCALA
+
+TURNOS = ['Matutino', 'Vespertino']
+COLUNAS_VIOLACOES = ['Data', 'Turno', 'Funcionário', 'Tipo', 'Violação', 'Detalhe']
+
+# Tipos de violação, na ordem em que aparecem no relatório
+VIOLACOES = {
+    'folga_dia': 'Escalado em dia de folga',
+    'folga_intervalo': 'Escalado em período de folga',
+    'folga_dia_semana': 'Escalado em dia da semana de folga',
+    'folga_turno': 'Escalado em turno de folga',
+    'fixo_ignorado': 'Alocação fixa ignorada',
+    'turno_vago': 'Turno sem funcionário',
+    'turno_duplo': 'Dois turnos no mesmo dia',
+}
+NOMES_DIAS = pd.Series(['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo'])
+
+# Ler uma escala de um arquivo CSV ou XLSX (caminho ou arquivo enviado pela interface)
+# No XLSX, todas as abas com o cabeçalho da escala são concatenadas (a aba "Estatísticas" é ignorada)
+def ler_escala(arquivo, nome_arquivo=None):
+    nome = str(nome_arquivo or getattr(arquivo, 'name', arquivo)).lower()
+    if nome.endswith(('.xlsx', '.xlsm')):
+        abas = pd.read_excel(arquivo, sheet_name=None, dtype=str)
+        abas = [aba for aba in abas.values() if set(CABECALHO_ESCALA) <= set(aba.columns)]
+        escala = pd.concat(abas, ignore_index=True) if abas else pd.DataFrame(columns=CABECALHO_ESCALA)
+    elif nome.endswith('.csv'):
+        escala = pd.read_csv(arquivo, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError(f"Formato de arquivo não suportado: {nome}")
+    
+    faltando = [coluna for coluna in CABECALHO_ESCALA if coluna not in escala.columns]
+    if faltando:
+        raise ValueError(f"A escala precisa das colunas: {', '.join(faltando)}")
+    return escala
+
+# Escala em formato longo: uma linha por (equipe, data, turno), com dia do mês, dia da semana e funcionário
+def escala_longa(escalas_df):
+    datas = pd.to_datetime(escalas_df['Data'].astype('string').str.strip(), format='%d/%m/%Y', errors='coerce')
+    invalidas = datas.isna().to_numpy()
+    if invalidas.any():
+        linhas = ', '.join(str(i + 1) for i in invalidas.nonzero()[0][:10])
+        raise ValueError(f"Datas inválidas na escala (linhas {linhas}); use o formato dd/mm/aaaa")
+    
+    partes = []
+    for turno in TURNOS:
+        partes.append(pd.DataFrame({
+            'equipe': escalas_df['equipe'].to_numpy(),
+            'data': datas.to_numpy(),
+            'turno': turno,
+            'funcionario': escalas_df[f'Turno {turno}'].astype('string').str.strip().replace('', pd.NA)
+                           .astype(object).to_numpy(),
+        }))
+    # Textos como object: evita tipos de string incompatíveis ao juntar e concatenar colunas
+    longa = pd.concat(partes, ignore_index=True).astype({'turno': object})
+    longa['dia'] = longa['data'].dt.day
+    longa['dia_semana'] = longa['data'].dt.weekday
+    return longa
+
+# Ocupante esperado de cada (equipe, data, turno) pelas alocações fixas, com a mesma prioridade de
+# compilar_disponibilidade: primeiro as alocações por dia da semana, depois as por dia específico
+def ocupantes_fixos(turnos, restricoes):
+    fixas = restricoes[restricoes['tipo'].isin(['fixo_dia_semana', 'fixo_dia'])]
+    por_dia_semana = turnos.merge(
+        fixas[fixas['tipo'] == 'fixo_dia_semana'], left_on=['equipe', 'dia_semana', 'turno'],
+        right_on=['equipe', 'dia', 'turno'], suffixes=('', '_fixo')
+    )
+    por_dia = turnos.merge(fixas[fixas['tipo'] == 'fixo_dia'], on=['equipe', 'dia', 'turno'])
+    colunas = ['equipe', 'data', 'turno', 'funcionario', 'prioridade']
+    return (
+        pd.concat([por_dia_semana[colunas], por_dia[colunas]], ignore_index=True)
+        .sort_values('prioridade', kind='stable')
+        .drop_duplicates(['equipe', 'data', 'turno'])
+        .rename(columns={'funcionario': 'fixo'})
+        .drop(columns='prioridade')
+    )
+
+# Números como texto (object), para compor as descrições das violações
+def texto(serie):
+    return serie.astype(str).astype(object)
+
+# Linhas da escala longa que violam uma regra, no formato interno do relatório
+def violacoes(linhas, tipo, detalhe):
+    return pd.DataFrame({
+        'equipe': linhas['equipe'].to_numpy(),
+        'data': linhas['data'].to_numpy(),
+        'turno': linhas['turno'].to_numpy(),
+        'funcionario': linhas['funcionario'].to_numpy(),
+        'tipo': tipo,
+        'detalhe': detalhe.to_numpy() if isinstance(detalhe, pd.Series) else detalhe,
+    })
+
+# Validar várias escalas de uma vez: todas as equipes e meses passam pelas mesmas junções
+# escalas: iterável de (equipe, escala_df, excecoes, alocacoes_fixas, funcionarios), com escala_df no formato
+# do CSV exportado (pode cobrir vários meses); com funcionarios (ou None), alocações fixas de nomes fora da lista
+# são ignoradas, como na geração
+# Retorna um DataFrame com uma linha por violação (colunas "Equipe" e COLUNAS_VIOLACOES)
+def validar_escalas(escalas):
+    quadros = []
+    linhas = []
+    for equipe, escala_df, excecoes, alocacoes_fixas, funcionarios in escalas:
+        quadros.append(escala_df[CABECALHO_ESCALA].assign(equipe=equipe))
+        nomes = None if funcionarios is None else set(funcionarios)
+        linhas += [
+            (equipe, *linha) for linha in linhas_de_restricoes(excecoes, alocacoes_fixas)
+            if nomes is None or not linha[1].startswith('fixo') or linha[0] in nomes
+        ]
+    if not quadros:
+        return pd.DataFrame(columns=['Equipe'] + COLUNAS_VIOLACOES)
+    
+    longa = escala_longa(pd.concat(quadros, ignore_index=True))
+    # A posição da linha dá a prioridade entre alocações fixas concorrentes
+    restricoes = pd.DataFrame(linhas, columns=['equipe'] + COLUNAS_RESTRICOES, dtype=object).astype(
+        {'dia': 'int64', 'dia_fim': 'float64'}
+    )
+    restricoes['prioridade'] = range(len(restricoes))
+    por_tipo = {tipo: grupo for tipo, grupo in restricoes.groupby('tipo', sort=False)}
+    vazio = restricoes.iloc[:0]
+    
+    turnos = longa[['equipe', 'data', 'turno', 'dia', 'dia_semana']]
+    longa = longa.merge(ocupantes_fixos(turnos, restricoes), on=['equipe', 'data', 'turno'], how='left')
+    
+    # Alocações fixas têm prioridade sobre as exceções: o ocupante fixo do turno não viola folgas
+    escalados = longa[longa['funcionario'].notna() & (longa['funcionario'] != longa['fixo']).fillna(True)]
+    partes = []
+    
+    folgas = escalados.merge(por_tipo.get('folga_dia', vazio)[['equipe', 'funcionario', 'dia']],
+                             on=['equipe', 'funcionario', 'dia'])
+    partes.append(violacoes(folgas, 'folga_dia', 'Folga no dia ' + texto(folgas['dia'])))
+    
+    folgas = escalados.merge(por_tipo.get('folga_intervalo', vazio)[['equipe', 'funcionario', 'dia', 'dia_fim']],
+                             on=['equipe', 'funcionario'], suffixes=('', '_inicio'))
+    folgas = folgas[(folgas['dia_inicio'] <= folgas['dia']) & (folgas['dia'] <= folgas['dia_fim'])]
+    partes.append(violacoes(
+        folgas, 'folga_intervalo',
+        'Folga do dia ' + texto(folgas['dia_inicio']) + ' ao dia ' + texto(folgas['dia_fim'].astype('int64'))
+    ))
+    
+    folgas = escalados.merge(
+        por_tipo.get('folga_dia_semana', vazio)[['equipe', 'funcionario', 'dia']].rename(columns={'dia': 'dia_semana'}),
+        on=['equipe', 'funcionario', 'dia_semana']
+    )
+    partes.append(violacoes(
+        folgas, 'folga_dia_semana',
+        'Folga às ' + folgas['dia_semana'].map(NOMES_DIAS).str.lower() + 's'
+    ))
+    
+    folgas = escalados.merge(por_tipo.get('folga_turno', vazio)[['equipe', 'funcionario', 'dia', 'turno']],
+                             on=['equipe', 'funcionario', 'dia', 'turno'])
+    partes.append(violacoes(
+        folgas, 'folga_turno', 'Folga no turno ' + folgas['turno'] + ' do dia ' + texto(folgas['dia'])
+    ))
+    
+    ignoradas = longa[longa['fixo'].notna() & (longa['funcionario'] != longa['fixo']).fillna(True)]
+    partes.append(violacoes(ignoradas, 'fixo_ignorado', 'Turno fixo de ' + ignoradas['fixo']))
+    
+    vagos = longa[longa['funcionario'].isna()]
+    partes.append(violacoes(vagos, 'turno_vago', ''))
+    
+    # Dois turnos no mesmo dia: as linhas matutinas e vespertinas estão alinhadas pela posição
+    matutino, vespertino = (longa[longa['turno'] == turno].reset_index(drop=True) for turno in TURNOS)
+    duplos = matutino[(matutino['funcionario'] == vespertino['funcionario']).fillna(False).to_numpy()]
+    partes.append(violacoes(duplos.assign(turno='Matutino e Vespertino'), 'turno_duplo', ''))
+    
+    resultado = pd.concat(partes, ignore_index=True)
+    resultado['ordem'] = resultado['tipo'].map({tipo: i for i, tipo in enumerate(VIOLACOES)})
+    resultado = resultado.sort_values(['equipe', 'data', 'turno', 'ordem'], kind='stable').reset_index(drop=True)
+    return pd.DataFrame({
+        'Equipe': resultado['equipe'],
+        'Data': resultado['data'].dt.strftime('%d/%m/%Y'),
+        'Turno': resultado['turno'],
+        'Funcionário': resultado['funcionario'],
+        'Tipo': resultado['tipo'],
+        'Violação': resultado['tipo'].map(VIOLACOES),
+        'Detalhe': resultado['detalhe'],
+    }, columns=['Equipe'] + COLUNAS_VIOLACOES)
+
+# Validar uma escala (DataFrame no formato do CSV exportado) contra excecoes e alocacoes_fixas
+# Retorna um DataFrame com uma linha por violação (colunas COLUNAS_VIOLACOES); vazio se a escala estiver correta
+def validar_escala(escala_df, excecoes, alocacoes_fixas, funcionarios=None):
+    return validar_escalas([('', escala_df, excecoes, alocacoes_fixas, funcionarios)]).drop(columns='Equipe')
+
+# Total de violações por tipo, na ordem de VIOLACOES (só os tipos encontrados)
+def resumo_violacoes(violacoes_df):
+    contagem = violacoes_df['Tipo'].value_counts()
+    return pd.DataFrame(
+        [(VIOLACOES[tipo], int(contagem[tipo])) for tipo in VIOLACOES if tipo in contagem],
+        columns=['Violação', 'Ocorrências']
+    )
+
+def main(argv=None):
+    from escala import carregar_equipe
+    
+    parser = argparse.ArgumentParser(description="Validar escalas (CSV/XLSX) contra as restrições de uma equipe.")
+    parser.add_argument("equipe", help="Configuração da equipe (JSON, CSV ou XLSX), como em lote.py")
+    parser.add_argument("escalas", nargs="+", help="Arquivos de escala no formato do CSV exportado")
+    args = parser.parse_args(argv)
+    
+    equipe = carregar_equipe(args.equipe)
+    encontradas = validar_escalas(
+        (arquivo, ler_escala(arquivo), equipe['excecoes'], equipe['alocacoes_fixas'], equipe['funcionarios'])
+        for arquivo in args.escalas
+    )
+    for arquivo in args.escalas:
+        do_arquivo = encontradas[encontradas['Equipe'] == arquivo]
+        if do_arquivo.empty:
+            print(f"{arquivo}: nenhuma violação")
+        else:
+            print(f"{arquivo}: {len(do_arquivo)} violações")
+            print(do_arquivo.drop(columns=['Equipe', 'Tipo']).to_string(index=False))
+    return 1 if len(encontradas) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
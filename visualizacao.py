@@ -0,0 +1,89 @@
+# Preparação de dados e gráficos da aba "Visualização"
+# Tudo é feito com operações vetorizadas sobre o DataFrame da escala, sem laço por linha
+import calendar
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+# Acima destes limites o gráfico diário deixa de mostrar os nomes nas células e a legenda de cores
+LIMITE_ROTULOS = 120
+LIMITE_LEGENDA = 20
+# No modo automático, equipes maiores que isto (ou escalas com mais células) usam a visão semanal
+LIMITE_FUNCIONARIOS_DIARIO = 30
+LIMITE_CELULAS_DIARIO = 400
+
+# Formato longo (Dia, Turno, Funcionário), uma linha por turno, direto dos arrays da EscalaColunar
+# Turnos vagos aparecem como "-"
+def calendario_longo(escala):
+    n = len(escala)
+    categorias = escala.nomes.append(pd.Index(["-"], dtype=object)).unique()
+    codigos = np.concatenate([escala.matutino, escala.vespertino]).astype(np.int32)
+    codigos[codigos < 0] = categorias.get_loc("-")
+    cal_df = pd.DataFrame({
+        "Dia": np.tile(escala.dias, 2),
+        "Turno": pd.Categorical.from_codes(np.repeat(np.int8([0, 1]), n), categories=["Matutino", "Vespertino"]),
+        "Funcionário": pd.Categorical.from_codes(codigos, categories=categorias),
+    })
+    return cal_df.sort_values(["Dia", "Turno"], kind="stable", ignore_index=True)
+
+# Agregação por funcionário e semana do mês (contagem de turnos), calculada no servidor
+def carga_semanal(cal_df, mes, ano):
+    deslocamento = calendar.monthrange(ano, mes)[0]  # Dia da semana do dia 1
+    trabalhados = cal_df[cal_df["Funcionário"] != "-"]
+    semana = (trabalhados["Dia"] - 1 + deslocamento) // 7 + 1
+    return (
+        trabalhados.assign(Semana=semana)
+        .groupby(["Funcionário", "Semana"], sort=False, observed=True)
+        .size()
+        .reset_index(name="Turnos")
+    )
+
+# Escolher a visão adequada ao tamanho da escala: "diaria" ou "semanal"
+def modo_automatico(cal_df):
+    funcionarios = cal_df.loc[cal_df["Funcionário"] != "-", "Funcionário"].nunique()
+    if funcionarios > LIMITE_FUNCIONARIOS_DIARIO or len(cal_df) > LIMITE_CELULAS_DIARIO:
+        return "semanal"
+    return "diaria"
+
+# Heatmap dia × turno; rótulos e legenda só são enviados quando cabem na tela
+def grafico_diario(cal_df, mes, ano):
+    funcionarios = cal_df["Funcionário"].nunique()
+    legenda = alt.Legend(orient="bottom") if funcionarios <= LIMITE_LEGENDA else None
+    
+    heatmap = alt.Chart(cal_df).mark_rect().encode(
+        x=alt.X("Dia:O", title="Dia do Mês"),
+        y=alt.Y("Turno:N", title=None),
+        color=alt.Color("Funcionário:N", legend=legenda),
+        tooltip=["Dia", "Turno", "Funcionário"]
+    ).properties(
+        title=f"Escala de {calendar.month_name[mes]} de {ano}",
+        width=600
+    )
+    
+    if len(cal_df) > LIMITE_ROTULOS:
+        return heatmap
+    
+    # Adicionar rótulos (reaproveitando os dados do heatmap, sem enviá-los de novo)
+    text = heatmap.mark_text().encode(
+        text="Funcionário",
+        color=alt.condition(
+            alt.datum.Funcionário == "-",
+            alt.value("red"),
+            alt.value("white")
+        )
+    )
+    return heatmap + text
+
+# Heatmap funcionário × semana com a quantidade de turnos
+def grafico_semanal(semanal, mes, ano):
+    altura = min(20 * max(semanal["Funcionário"].nunique(), 1), 2000)
+    return alt.Chart(semanal).mark_rect().encode(
+        x=alt.X("Semana:O", title="Semana do Mês"),
+        y=alt.Y("Funcionário:N", title=None, sort=None),
+        color=alt.Color("Turnos:Q", title="Turnos", scale=alt.Scale(scheme="blues")),
+        tooltip=["Funcionário", "Semana", "Turnos"]
+    ).properties(
+        title=f"Turnos por semana em {calendar.month_name[mes]} de {ano}",
+        height=altura
+    )